@@ -0,0 +1,177 @@
+"""
+Microbenchmark: product serialization on 100-result pages.
+
+Compares the shared converter in services/product_converter.py with the
+per-service converters it replaced (kept below, verbatim, as the baseline).
+
+Run from backend/:
+    python -m benchmarks.bench_product_converter
+"""
+from google.cloud.retail_v2.types import Product, PriceInfo, Image, CustomAttribute
+from typing import Any, Dict, List
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GCP_PROJECT_ID", "benchmark")
+
+from services.product_converter import product_to_dict, parse_fields
+
+PAGE_SIZE = 100
+REPEAT = 5
+NUMBER = 20
+
+def build_page(size: int = PAGE_SIZE) -> List[Product]:
+    """Build a page of realistic Product messages"""
+    return [
+        Product(
+            name=f"projects/p/locations/global/catalogs/default_catalog/branches/0/products/sku-{i}",
+            id=f"sku-{i}",
+            title=f"Cordless Drill Driver 18V Model {i}",
+            description="Compact cordless drill driver with two-speed gearbox and LED work light. " * 3,
+            categories=["Tools > Power Tools > Drills", "Tools > Cordless"],
+            brands=[f"Brand {i % 7}"],
+            price_info=PriceInfo(currency_code="USD", price=99.0 + i, original_price=129.0 + i),
+            availability=Product.Availability.IN_STOCK,
+            uri=f"https://example.com/products/sku-{i}",
+            images=[
+                Image(uri=f"https://example.com/images/sku-{i}-{n}.jpg", height=800, width=800)
+                for n in range(4)
+            ],
+            attributes={
+                "color": CustomAttribute(text=["black", "yellow"]),
+                "material": CustomAttribute(text=["plastic"]),
+                "voltage": CustomAttribute(numbers=[18.0]),
+                "weight_kg": CustomAttribute(numbers=[1.4]),
+            },
+        )
+        for i in range(size)
+    ]
+
+def legacy_search_convert(product) -> Dict[str, Any]:
+    """RetailSearchService._convert_product_to_dict before the shared converter"""
+    product_id = product.id
+    if not product_id and product.name:
+        product_id = product.name.split('/')[-1]
+    
+    price_info = None
+    if hasattr(product, 'price_info') and product.price_info:
+        pi = product.price_info
+        if hasattr(pi, 'price') and pi.price:
+            price_info = {
+                "currency_code": pi.currency_code if hasattr(pi, 'currency_code') else 'USD',
+                "price": float(pi.price) if pi.price else 0.0,
+                "original_price": float(pi.original_price) if hasattr(pi, 'original_price') and pi.original_price else None,
+                "cost": float(pi.cost) if hasattr(pi, 'cost') and pi.cost else None
+            }
+    
+    images = []
+    if hasattr(product, 'images') and product.images:
+        for img in product.images:
+            images.append({
+                "uri": img.uri if hasattr(img, 'uri') else '',
+                "height": img.height if hasattr(img, 'height') else 0,
+                "width": img.width if hasattr(img, 'width') else 0
+            })
+    
+    attributes = {}
+    if hasattr(product, 'attributes') and product.attributes:
+        for key, value in product.attributes.items():
+            if hasattr(value, 'text') and value.text:
+                attributes[key] = list(value.text)
+            elif hasattr(value, 'numbers') and value.numbers:
+                attributes[key] = list(value.numbers)
+    
+    return {
+        "id": product_id,
+        "name": product.name if hasattr(product, 'name') else '',
+        "title": product.title if product.title else '',
+        "description": product.description if hasattr(product, 'description') else '',
+        "categories": list(product.categories) if hasattr(product, 'categories') else [],
+        "brands": list(product.brands) if hasattr(product, 'brands') else [],
+        "price_info": price_info,
+        "availability": product.availability if hasattr(product, 'availability') else 'UNKNOWN',
+        "uri": product.uri if hasattr(product, 'uri') else '',
+        "images": images,
+        "attributes": attributes
+    }
+
+def legacy_products_convert(product) -> Dict[str, Any]:
+    """ProductsService/RecommendationsService._convert_product_to_dict before the shared converter"""
+    price_info = None
+    if hasattr(product, 'priceInfo') and product.priceInfo:
+        pi = product.priceInfo
+        price_info = {
+            "currency_code": pi.currencyCode if hasattr(pi, 'currencyCode') else 'USD',
+            "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
+            "original_price": float(pi.originalPrice) if hasattr(pi, 'originalPrice') else None,
+            "cost": float(pi.cost) if hasattr(pi, 'cost') else None
+        }
+    elif hasattr(product, 'price_info') and product.price_info:
+        pi = product.price_info
+        price_info = {
+            "currency_code": pi.currency_code if hasattr(pi, 'currency_code') else 'USD',
+            "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
+            "original_price": float(pi.original_price) if hasattr(pi, 'original_price') else None,
+            "cost": float(pi.cost) if hasattr(pi, 'cost') else None
+        }
+    
+    images = []
+    if hasattr(product, 'images') and product.images:
+        for img in product.images:
+            images.append({
+                "uri": img.uri if hasattr(img, 'uri') else '',
+                "height": img.height if hasattr(img, 'height') else 0,
+                "width": img.width if hasattr(img, 'width') else 0
+            })
+    
+    attributes = {}
+    if hasattr(product, 'attributes') and product.attributes:
+        for key, value in product.attributes.items():
+            if hasattr(value, 'text') and value.text:
+                attributes[key] = list(value.text)
+            elif hasattr(value, 'numbers') and value.numbers:
+                attributes[key] = list(value.numbers)
+    
+    return {
+        "id": product.id if hasattr(product, 'id') else '',
+        "name": product.name if hasattr(product, 'name') else '',
+        "title": product.title if hasattr(product, 'title') else 'Untitled Product',
+        "description": product.description if hasattr(product, 'description') else '',
+        "categories": list(product.categories) if hasattr(product, 'categories') else [],
+        "brands": list(product.brands) if hasattr(product, 'brands') else [],
+        "price_info": price_info,
+        "availability": product.availability if hasattr(product, 'availability') else 'UNKNOWN',
+        "uri": product.uri if hasattr(product, 'uri') else '',
+        "images": images,
+        "attributes": attributes
+    }
+
+def run() -> Dict[str, float]:
+    """Time each converter over one page; returns best ms per page"""
+    page = build_page()
+    card_fields = parse_fields("id,title,price_info,images")
+    
+    cases = {
+        "legacy_search": lambda: [legacy_search_convert(p) for p in page],
+        "legacy_products": lambda: [legacy_products_convert(p) for p in page],
+        "shared": lambda: [product_to_dict(p) for p in page],
+        "shared_projected": lambda: [product_to_dict(p, card_fields) for p in page],
+    }
+    
+    results = {}
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, repeat=REPEAT, number=NUMBER)) / NUMBER
+        results[name] = best * 1000
+    return results
+
+def main():
+    results = run()
+    baseline = results["legacy_search"]
+    print(f"Product conversion, {PAGE_SIZE}-result page (best of {REPEAT}x{NUMBER}):")
+    for name, ms in results.items():
+        print(f"  {name:<18} {ms:8.3f} ms/page  {baseline / ms:5.2f}x vs legacy_search")
+
+if __name__ == "__main__":
+    main()
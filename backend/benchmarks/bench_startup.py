@@ -0,0 +1,123 @@
+"""
+Startup benchmark: import time of main and time to the first served request.
+
+Each run starts a fresh interpreter, so nothing is warm. Import time is
+measured in-process around "import main"; time to first request runs uvicorn
+and polls GET /health until it answers, counting from process spawn (this
+includes the lifespan startup stage).
+
+Run from backend/:
+    python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 1500] [--first-request-budget-ms 4000]
+
+Exits with status 1 if a median exceeds its budget. Off GCP, set NO_GCE_CHECK=true
+so credential discovery does not spend seconds probing for a metadata server.
+"""
+from typing import Dict, List, Optional
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GCP_PROJECT_ID", "benchmark")
+    return env
+
+def measure_import() -> float:
+    """Seconds to import main in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def top_imports(limit: int = 10) -> List[tuple]:
+    """Slowest imports pulled in by main (two levels deep), from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True
+    ).stderr
+    
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # importtime indents nested imports by two spaces per level below main
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if 1 <= depth <= 2:
+            modules.append((name.strip(), int(cumulative_us) / 1000))
+    
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return modules[:limit]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_first_request(timeout: float = 30.0) -> Optional[float]:
+    """Seconds from spawning uvicorn until GET /health answers, or None on timeout"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=None)
+    parser.add_argument("--first-request-budget-ms", type=float, default=None)
+    args = parser.parse_args()
+    
+    imports = [measure_import() * 1000 for _ in range(args.runs)]
+    firsts = [measure_first_request() for _ in range(args.runs)]
+    firsts_ms = [seconds * 1000 for seconds in firsts if seconds is not None]
+    
+    import_median = statistics.median(imports)
+    print(f"Startup ({args.runs} fresh runs):")
+    print(f"  import main          median {import_median:8.1f} ms   min {min(imports):8.1f}   max {max(imports):8.1f}")
+    if firsts_ms:
+        first_median = statistics.median(firsts_ms)
+        print(f"  first request        median {first_median:8.1f} ms   min {min(firsts_ms):8.1f}   max {max(firsts_ms):8.1f}")
+    else:
+        first_median = None
+        print("  first request        no answer from /health")
+    
+    print("Slowest imports (cumulative):")
+    for name, ms in top_imports():
+        print(f"  {name:<55} {ms:8.1f} ms")
+    
+    failed = False
+    if args.import_budget_ms is not None and import_median > args.import_budget_ms:
+        print(f"FAIL: import time {import_median:.1f} ms exceeds budget {args.import_budget_ms:.1f} ms")
+        failed = True
+    if args.first_request_budget_ms is not None and (first_median is None or first_median > args.first_request_budget_ms):
+        print(f"FAIL: time to first request exceeds budget {args.first_request_budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
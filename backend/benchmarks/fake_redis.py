@@ -0,0 +1,138 @@
+"""
+Local stand-in for a Redis server, for running the shared cache offline.
+
+Speaks enough RESP2 for services/cache_store.RedisStore: PING, AUTH, SELECT,
+GET, SET (with PX/EX), DEL and SCAN (MATCH, COUNT). Everything is in memory
+and expires lazily. Point the backend at it with:
+    CACHE_L2_BACKEND=redis CACHE_L2_REDIS_URL=redis://127.0.0.1:<port>/0
+
+Run standalone from backend/:
+    python -m benchmarks.fake_redis --port 6390
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import re
+import time
+
+class FakeRedis:
+    """In-memory keyspace and the command handlers that serve it"""
+    
+    def __init__(self):
+        # key -> (value, expires_at or None)
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands: Dict[str, int] = {}
+    
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry[0]
+    
+    def execute(self, args: List[bytes]) -> object:
+        name = args[0].decode().upper()
+        self.commands[name] = self.commands.get(name, 0) + 1
+        
+        if name in ("PING", "AUTH", "SELECT"):
+            return "+PONG" if name == "PING" else "+OK"
+        if name == "GET":
+            return self._live(args[1])
+        if name == "SET":
+            expires_at = None
+            options = [arg.decode().upper() for arg in args[3:]]
+            for i, option in enumerate(options[:-1]):
+                if option == "PX":
+                    expires_at = time.time() + int(options[i + 1]) / 1000
+                elif option == "EX":
+                    expires_at = time.time() + int(options[i + 1])
+            self.data[args[1]] = (args[2], expires_at)
+            return "+OK"
+        if name == "DEL":
+            deleted = 0
+            for key in args[1:]:
+                if self._live(key) is not None:
+                    del self.data[key]
+                    deleted += 1
+            return deleted
+        if name == "SCAN":
+            # One pass over the whole keyspace; cursor is always 0 afterwards
+            options = [arg.decode() for arg in args[2:]]
+            pattern = options[options.index("MATCH") + 1] if "MATCH" in options else "*"
+            matcher = _glob_regex(pattern)
+            keys = [key for key in list(self.data) if self._live(key) is not None and matcher.fullmatch(key.decode())]
+            return [b"0", keys]
+        return f"-ERR unknown command '{name}'"
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                count = int(line[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:-2])
+                    args.append(await reader.readexactly(length))
+                    await reader.readexactly(2)
+                writer.write(_encode(self.execute(args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def _glob_regex(pattern: str) -> "re.Pattern[str]":
+    """Redis glob (*, ?, [...] with ^ negation, backslash escapes) as a regex"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        elif char == "*":
+            out.append(".*")
+        elif char == "?":
+            out.append(".")
+        elif char == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            negate = body.startswith("^")
+            body = body[1:] if negate else body
+            out.append("[" + ("^" if negate else "") + body.replace("\\", "\\\\") + "]")
+            i = end
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return re.compile("".join(out), re.DOTALL)
+
+def _encode(value: object) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return value.encode() + b"\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+async def start_server(fake: FakeRedis, port: int = 0):
+    """Start the stand-in on 127.0.0.1; returns (server, bound port)"""
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", port)
+    return server, server.sockets[0].getsockname()[1]
+
+async def serve(args):
+    server, port = await start_server(FakeRedis(), args.port)
+    print(f"Fake Redis on 127.0.0.1:{port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for a Redis server")
+    parser.add_argument("--port", type=int, default=6390)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,251 @@
+"""
+Local fake of the Retail API gRPC services, for offline load tests.
+
+Serves SearchService.Search, CompletionService.CompleteQuery,
+ProductService.GetProduct/ListProducts and PredictionService.Predict over
+plaintext gRPC from a generated catalog, with injected latency and errors.
+Point the backend at it with:
+    RETAIL_API_ENDPOINT=127.0.0.1:<port> RETAIL_API_INSECURE=true
+
+Run standalone from backend/:
+    python -m benchmarks.fake_retail --port 50051 --catalog-size 5000 --latency-ms 30
+"""
+from google.cloud.retail_v2.types import (
+    CompleteQueryRequest,
+    CompleteQueryResponse,
+    GetProductRequest,
+    ListProductsRequest,
+    ListProductsResponse,
+    PredictRequest,
+    PredictResponse,
+    Product,
+    SearchRequest,
+    SearchResponse
+)
+from google.protobuf import json_format
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import math
+import random
+import grpc
+
+WORDS = [
+    "drill", "driver", "saw", "sander", "hammer", "wrench", "ladder", "lamp", "bulb", "cable",
+    "paint", "brush", "roller", "tape", "glue", "screw", "nail", "bolt", "hinge", "lock",
+    "shelf", "hook", "tile", "grout", "pipe", "valve", "tap", "hose", "mower", "trimmer",
+    "cordless", "compact", "heavy", "duty", "outdoor", "indoor", "steel", "brass", "black", "white"
+]
+
+CATEGORIES = [
+    "Tools > Power Tools > Drills",
+    "Tools > Power Tools > Saws",
+    "Tools > Hand Tools",
+    "Lighting > Bulbs",
+    "Lighting > Lamps",
+    "Decorating > Paint",
+    "Plumbing > Pipes & Fittings",
+    "Garden > Mowers"
+]
+
+BRANDS = ["Acme", "Bolt & Co", "Forge", "Northline", "Pinnacle", "Tradesman"]
+
+class FakeRetailConfig:
+    """Catalog size and per-RPC latency/error injection"""
+    
+    def __init__(
+        self,
+        catalog_size: int = 5000,
+        latency_ms: float = 30.0,
+        latency_sigma: float = 0.5,
+        rpc_latency_ms: Optional[Dict[str, float]] = None,
+        error_rate: float = 0.0,
+        seed: int = 42
+    ):
+        self.catalog_size = catalog_size
+        # Latencies are log-normal around the median, so there is a realistic tail
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rpc_latency_ms = rpc_latency_ms or {}
+        self.error_rate = error_rate
+        self.seed = seed
+
+class FakeRetail:
+    """Generated catalog and the RPC handlers that serve it"""
+    
+    def __init__(self, config: FakeRetailConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.calls: Dict[str, int] = {}
+        
+        self.products: List = []
+        self.by_id: Dict[str, object] = {}
+        self.by_word: Dict[str, List[int]] = {word: [] for word in WORDS}
+        self.metadata: List[dict] = []
+        
+        rng = random.Random(config.seed)
+        for i in range(config.catalog_size):
+            words = rng.sample(WORDS, 3)
+            product = Product.pb(Product(
+                name=f"projects/fake/locations/global/catalogs/default_catalog/branches/0/products/sku-{i}",
+                id=f"sku-{i}",
+                title=" ".join(words).title(),
+                description=f"{' '.join(words)} for everyday jobs",
+                categories=[rng.choice(CATEGORIES)],
+                brands=[rng.choice(BRANDS)],
+                price_info={"currency_code": "USD", "price": round(rng.uniform(2, 400), 2)},
+                availability=Product.Availability.IN_STOCK,
+                uri=f"https://example.com/products/sku-{i}",
+                images=[{"uri": f"https://example.com/images/sku-{i}.jpg", "height": 800, "width": 800}],
+                attributes={"color": {"text": [rng.choice(["black", "white", "red"])]}}
+            ))
+            self.products.append(product)
+            self.by_id[product.id] = product
+            self.metadata.append(json_format.MessageToDict(product))
+            for word in words:
+                self.by_word[word].append(i)
+    
+    async def _delay(self, rpc: str, context) -> None:
+        self.calls[rpc] = self.calls.get(rpc, 0) + 1
+        median = self.config.rpc_latency_ms.get(rpc, self.config.latency_ms)
+        await asyncio.sleep(median * math.exp(self.random.gauss(0, self.config.latency_sigma)) / 1000)
+        if self.random.random() < self.config.error_rate:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "injected error")
+    
+    async def search(self, request, context):
+        await self._delay("search", context)
+        
+        words = [word for word in request.query.lower().split() if word in self.by_word]
+        matches = self.by_word[words[0]] if words else range(len(self.products))
+        
+        response = SearchResponse.pb()(total_size=len(matches), attribution_token="fake")
+        for index in matches[request.offset:request.offset + (request.page_size or 20)]:
+            product = self.products[index]
+            result = response.results.add(id=product.id)
+            result.product.CopyFrom(product)
+        
+        for spec in request.facet_specs:
+            key = spec.facet_key.key
+            if key not in ("categories", "brands"):
+                continue
+            counts: Dict[str, int] = {}
+            for index in matches:
+                for value in getattr(self.products[index], key):
+                    counts[value] = counts.get(value, 0) + 1
+            facet = response.facets.add(key=key)
+            for value, count in sorted(counts.items(), key=lambda c: c[1], reverse=True)[:spec.limit or 20]:
+                facet.values.add(value=value, count=count)
+        return response
+    
+    async def complete_query(self, request, context):
+        await self._delay("complete_query", context)
+        
+        prefix = request.query.lower().split()[-1] if request.query.strip() else ""
+        response = CompleteQueryResponse.pb()(attribution_token="fake")
+        for word in WORDS:
+            if word.startswith(prefix) and len(response.completion_results) < (request.max_suggestions or 5):
+                response.completion_results.add(suggestion=word)
+        return response
+    
+    async def get_product(self, request, context):
+        await self._delay("get_product", context)
+        
+        product = self.by_id.get(request.name.rsplit("/", 1)[-1])
+        if product is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Product {request.name} not found")
+        return product
+    
+    async def list_products(self, request, context):
+        await self._delay("list_products", context)
+        
+        offset = int(request.page_token) if request.page_token else 0
+        page_size = request.page_size or 100
+        response = ListProductsResponse.pb()()
+        response.products.extend(self.products[offset:offset + page_size])
+        if offset + page_size < len(self.products):
+            response.next_page_token = str(offset + page_size)
+        return response
+    
+    async def predict(self, request, context):
+        await self._delay("predict", context)
+        
+        seed = request.user_event.product_details[0].product.id if request.user_event.product_details else ""
+        picks = random.Random(seed).sample(range(len(self.products)), min(request.page_size or 10, len(self.products)))
+        return_product = "returnProduct" in request.params and request.params["returnProduct"].bool_value
+        
+        response = PredictResponse.pb()(attribution_token="fake")
+        for index in picks:
+            result = response.results.add(id=self.products[index].id)
+            if return_product:
+                result.metadata["product"].struct_value.update(self.metadata[index])
+        return response
+    
+    def handlers(self) -> List[grpc.GenericRpcHandler]:
+        def unary(handler, request_type, response_type):
+            return grpc.unary_unary_rpc_method_handler(
+                handler,
+                request_deserializer=request_type.pb().FromString,
+                response_serializer=response_type.pb().SerializeToString
+            )
+        
+        return [
+            grpc.method_handlers_generic_handler("google.cloud.retail.v2.SearchService", {
+                "Search": unary(self.search, SearchRequest, SearchResponse)
+            }),
+            grpc.method_handlers_generic_handler("google.cloud.retail.v2.CompletionService", {
+                "CompleteQuery": unary(self.complete_query, CompleteQueryRequest, CompleteQueryResponse)
+            }),
+            grpc.method_handlers_generic_handler("google.cloud.retail.v2.ProductService", {
+                "GetProduct": unary(self.get_product, GetProductRequest, Product),
+                "ListProducts": unary(self.list_products, ListProductsRequest, ListProductsResponse)
+            }),
+            grpc.method_handlers_generic_handler("google.cloud.retail.v2.PredictionService", {
+                "Predict": unary(self.predict, PredictRequest, PredictResponse)
+            })
+        ]
+
+async def start_server(fake: FakeRetail, port: int = 0):
+    """Start the fake on 127.0.0.1; returns (server, bound port)"""
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers(fake.handlers())
+    bound_port = server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+    return server, bound_port
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """CLI options shared with the load test"""
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Median upstream latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread; 0 for fixed latency")
+    parser.add_argument(
+        "--rpc-latency", action="append", default=[], metavar="RPC=MS",
+        help="Per-RPC median, e.g. search=80 (search, complete_query, get_product, list_products, predict)"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failed with UNAVAILABLE")
+    parser.add_argument("--seed", type=int, default=42)
+
+def config_from_args(args) -> FakeRetailConfig:
+    rpc_latency = {}
+    for item in args.rpc_latency:
+        rpc, ms = item.split("=", 1)
+        rpc_latency[rpc] = float(ms)
+    return FakeRetailConfig(
+        catalog_size=args.catalog_size,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rpc_latency_ms=rpc_latency,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+
+async def serve(args):
+    fake = FakeRetail(config_from_args(args))
+    server, port = await start_server(fake, args.port)
+    print(f"Fake Retail API on 127.0.0.1:{port} ({args.catalog_size} products)")
+    await server.wait_for_termination()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake of the Retail API")
+    parser.add_argument("--port", type=int, default=50051)
+    add_arguments(parser)
+    asyncio.run(serve(parser.parse_args()))
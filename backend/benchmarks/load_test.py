@@ -0,0 +1,209 @@
+"""
+Offline load test: the real backend against a local fake Retail API.
+
+Starts benchmarks/fake_retail.py in-process, runs the backend under uvicorn
+in a subprocess pointed at it, then drives /api/search,
+/api/search/autocomplete, /api/products/{id} and /api/recommendations with
+concurrent clients. Reports throughput and p50/p95/p99 latency per endpoint.
+Requests are drawn from a seeded generator, so runs are reproducible.
+Run it on a machine with a core to spare for the load generator, or the
+client becomes the bottleneck (a warning is printed when it does).
+
+Run from backend/ (needs benchmarks/requirements.txt):
+    python -m benchmarks.load_test --duration 20 --concurrency 32
+    python -m benchmarks.load_test --env SEARCH_CACHE_ENABLED=true --json results.json
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_retail import FakeRetail, WORDS, add_arguments, config_from_args, start_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ("search", "autocomplete", "product", "recommendations")
+
+class RequestMix:
+    """Seeded request generator; product IDs are skewed so a few are hot"""
+    
+    def __init__(self, catalog_size: int, seed: int):
+        self.catalog_size = catalog_size
+        self.random = random.Random(seed)
+    
+    def product_id(self) -> str:
+        return f"sku-{int(self.catalog_size * self.random.random() ** 3)}"
+    
+    def build(self, endpoint: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """Return (method, path, JSON body) for one request"""
+        if endpoint == "search":
+            query = " ".join(self.random.sample(WORDS, self.random.choice((1, 2))))
+            return "POST", "/api/search", {"query": query, "page_size": 20}
+        if endpoint == "autocomplete":
+            word = self.random.choice(WORDS)
+            return "GET", f"/api/search/autocomplete?query={word[:self.random.randint(1, len(word))]}", None
+        if endpoint == "product":
+            return "GET", f"/api/products/{self.product_id()}", None
+        return "POST", "/api/recommendations", {
+            "model": "similar_items",
+            "product_id": self.product_id(),
+            "page_size": 10
+        }
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def start_backend(grpc_port: int, extra_env: Dict[str, str]) -> Tuple[asyncio.subprocess.Process, str]:
+    """Run the backend under uvicorn against the fake; returns (process, base URL)"""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "GCP_PROJECT_ID": "loadtest",
+        "RETAIL_API_ENDPOINT": f"127.0.0.1:{grpc_port}",
+        "RETAIL_API_INSECURE": "true",
+        "LOG_LEVEL": "WARNING"
+    })
+    env.update(extra_env)
+    
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return process, base_url
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Backend did not start")
+
+async def run_load(
+    base_url: str,
+    mix: RequestMix,
+    endpoints: List[str],
+    concurrency: int,
+    duration: float
+) -> Dict[str, List[Tuple[float, bool]]]:
+    """Run closed-loop clients for duration seconds; returns endpoint -> [(seconds, ok)]"""
+    samples: Dict[str, List[Tuple[float, bool]]] = {endpoint: [] for endpoint in endpoints}
+    deadline = time.perf_counter() + duration
+    
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                endpoint = mix.random.choice(endpoints)
+                method, path, body = mix.build(endpoint)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                samples[endpoint].append((time.perf_counter() - started, ok))
+        
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+def summarize(samples: Dict[str, List[Tuple[float, bool]]], duration: float) -> Dict[str, Dict[str, float]]:
+    """Throughput, error count and latency percentiles per endpoint"""
+    def percentiles(latencies: List[float]) -> Dict[str, float]:
+        if len(latencies) < 2:
+            value = latencies[0] * 1000 if latencies else 0.0
+            return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        return {"p50_ms": cuts[49] * 1000, "p95_ms": cuts[94] * 1000, "p99_ms": cuts[98] * 1000}
+    
+    summary = {}
+    everything = []
+    for endpoint, results in samples.items():
+        latencies = [seconds for seconds, _ in results]
+        everything.extend(results)
+        summary[endpoint] = {
+            "requests": len(results),
+            "errors": sum(1 for _, ok in results if not ok),
+            "rps": len(results) / duration,
+            **percentiles(latencies)
+        }
+    summary["total"] = {
+        "requests": len(everything),
+        "errors": sum(1 for _, ok in everything if not ok),
+        "rps": len(everything) / duration,
+        **percentiles([seconds for seconds, _ in everything])
+    }
+    return summary
+
+def print_summary(summary: Dict[str, Dict[str, float]], upstream_calls: Dict[str, int]):
+    print(f"{'endpoint':<16} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in summary.items():
+        print(
+            f"{endpoint:<16} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
+    print("Upstream calls: " + ", ".join(f"{rpc}={count}" for rpc, count in sorted(upstream_calls.items())))
+
+async def main_async(args):
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    endpoints = [endpoint for endpoint in args.endpoints.split(",") if endpoint]
+    
+    fake = FakeRetail(config_from_args(args))
+    server, grpc_port = await start_server(fake)
+    process, base_url = await start_backend(grpc_port, extra_env)
+    try:
+        mix = RequestMix(args.catalog_size, args.seed)
+        if args.warmup > 0:
+            await run_load(base_url, mix, endpoints, args.concurrency, args.warmup)
+        fake.calls.clear()
+        
+        cpu_started = time.process_time()
+        samples = await run_load(base_url, mix, endpoints, args.concurrency, args.duration)
+        harness_cpu = (time.process_time() - cpu_started) / args.duration
+        summary = summarize(samples, args.duration)
+    finally:
+        process.terminate()
+        await process.wait()
+        await server.stop(None)
+    
+    print(f"Load test: {args.concurrency} clients for {args.duration}s, upstream median {args.latency_ms} ms")
+    print_summary(summary, fake.calls)
+    if harness_cpu > 0.8:
+        # The load generator and fake share one process; if it saturates a core, so does the result
+        print(f"Warning: load generator used {harness_cpu:.0%} of a core; results understate backend capacity")
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": vars(args),
+                "endpoints": summary,
+                "upstream_calls": fake.calls,
+                "harness_cpu": harness_cpu
+            }, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against a fake Retail API")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent closed-loop clients")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"Comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra backend setting")
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    add_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Microbenchmark suite for backend hot paths, with a tracked baseline.
+
+Cases run offline on synthetic fixtures:
+  - product_to_dict, full and projected, on 20- and 100-result pages
+  - RetailSearchService facet flattening
+  - CategoriesService category extraction (slugs and sorting) and tree building
+  - APIResponse serialization of 20- and 100-item pages, through FastAPI's
+    default path and through FastJSONResponse
+
+Timings are in microseconds per call: the best of several repeats, then the
+median over --runs passes of the suite. A fixed
+pure-Python calibration workload is timed alongside every case, and cases
+are compared with the baseline as multiples of it, so a baseline recorded on
+one machine stays usable on a faster or slower one.
+
+Run from backend/:
+    python -m benchmarks.microbench                      # compare with benchmarks/baseline.json
+    python -m benchmarks.microbench --json results.json  # also write the results
+    python -m benchmarks.microbench --update-baseline    # record a new baseline
+
+Exits with status 1 if a case is slower than its baseline by more than
+--threshold (default 30%).
+"""
+from google.cloud.retail_v2.types import Product, SearchResponse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GCP_PROJECT_ID", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.bench_product_converter import build_page
+from benchmarks.fake_retail import BRANDS, CATEGORIES
+from models import APIResponse
+from responses import FastJSONResponse
+from services.categories_service import CategoriesService
+from services.product_converter import parse_fields, product_to_dict
+from services.retail_search_service import RetailSearchService
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+REPEAT = 15
+LOOP_SECONDS = 0.02
+
+CARD_FIELDS = "id,title,price_info,images"
+
+def calibration_work():
+    """Reference pure-Python workload that the cases are normalized by"""
+    total = 0
+    for i in range(2000):
+        total += len(str(i)) * (i % 7)
+    return {str(i): total for i in range(200)}
+
+def build_facets(categories: int = 200) -> List[Any]:
+    """A search response's facets: categories, brands and a price histogram"""
+    response = SearchResponse.pb()()
+    facet = response.facets.add(key="categories")
+    for i in range(categories):
+        facet.values.add(value=f"{CATEGORIES[i % len(CATEGORIES)]} > Range {i}", count=10000 - i * 7)
+    facet = response.facets.add(key="brands")
+    for i, brand in enumerate(BRANDS * 5):
+        facet.values.add(value=f"{brand} {i}", count=500 - i)
+    facet = response.facets.add(key="price")
+    for i in range(10):
+        facet.values.add(interval={"minimum": i * 50.0, "maximum": (i + 1) * 50.0}, count=100 + i)
+    return response.facets
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    """Case name -> zero-argument callable"""
+    search_service = RetailSearchService()
+    categories_service = CategoriesService()
+    card_fields = parse_fields(CARD_FIELDS)
+    facets = build_facets()
+    categories = categories_service._extract_categories(facets)
+    
+    cases = {}
+    for size in (20, 100):
+        page = [Product.pb(product) for product in build_page(size)]
+        data = {
+            "results": [{"id": product.id, "product": product_to_dict(product)} for product in page],
+            "total_size": 5000,
+            "facets": search_service._convert_facets(facets)
+        }
+        
+        cases[f"product_to_dict.full.{size}"] = lambda page=page: [product_to_dict(p) for p in page]
+        cases[f"product_to_dict.projected.{size}"] = lambda page=page: [product_to_dict(p, card_fields) for p in page]
+        # What FastAPI does with a response_model envelope: validate, encode, render
+        cases[f"api_response.default.{size}"] = lambda data=data: JSONResponse(
+            jsonable_encoder(APIResponse.model_validate(APIResponse(success=True, data=data)))
+        ).body
+        cases[f"api_response.fast_json.{size}"] = lambda data=data: FastJSONResponse(
+            {"success": True, "data": data, "error": None}
+        ).body
+    
+    cases["search.convert_facets"] = lambda: search_service._convert_facets(facets)
+    cases["categories.extract"] = lambda: categories_service._extract_categories(facets)
+    cases["categories.build_tree"] = lambda: categories_service._build_tree(categories)
+    return cases
+
+def _loops(fn: Callable[[], Any]) -> int:
+    """Calls per timing loop, so that one loop takes about LOOP_SECONDS"""
+    number, seconds = timeit.Timer(fn).autorange()
+    return max(1, int(number * LOOP_SECONDS / seconds))
+
+def _time(fn: Callable[[], Any], calibration: Callable[[], Any]) -> Tuple[float, float]:
+    """
+    Best microseconds per call of fn and of the calibration workload.
+    
+    The two are timed in alternating loops, so both see the same machine
+    load and their ratio stays stable on a noisy host.
+    """
+    fn_loops, calibration_loops = _loops(fn), _loops(calibration)
+    fn_best = calibration_best = float("inf")
+    for _ in range(REPEAT):
+        calibration_best = min(calibration_best, timeit.timeit(calibration, number=calibration_loops) / calibration_loops)
+        fn_best = min(fn_best, timeit.timeit(fn, number=fn_loops) / fn_loops)
+    return fn_best * 1e6, calibration_best * 1e6
+
+def run(only: Optional[List[str]] = None, runs: int = 1) -> Dict[str, Any]:
+    """Time every case, taking the median over runs; returns the machine-readable result document"""
+    cases = build_cases()
+    if only:
+        cases = {name: fn for name, fn in cases.items() if any(name.startswith(prefix) for prefix in only)}
+    
+    timings: Dict[str, List[Tuple[float, float]]] = {name: [] for name in cases}
+    for _ in range(runs):
+        for name, fn in cases.items():
+            timings[name].append(_time(fn, calibration_work))
+    
+    results = {}
+    for name, samples in timings.items():
+        results[name] = {
+            "us": round(statistics.median(us for us, _ in samples), 3),
+            "relative": round(statistics.median(us / calibration_us for us, calibration_us in samples), 4)
+        }
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": runs,
+        "calibration_us": round(statistics.median(c for samples in timings.values() for _, c in samples), 3),
+        "cases": results
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose normalized time regressed past threshold, as report lines"""
+    regressions = []
+    for name, case in results["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        change = case["relative"] / base["relative"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: {change:+.0%} vs baseline (threshold {threshold:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend hot-path microbenchmarks")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Allowed slowdown, e.g. 0.3 for 30%%")
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--runs", type=int, default=3, help="Passes over the suite; each case reports its median")
+    parser.add_argument("--only", action="append", default=[], metavar="PREFIX", help="Run cases with this name prefix")
+    args = parser.parse_args()
+    
+    results = run(args.only, args.runs)
+    
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    print(f"Microbenchmarks (median of {args.runs} runs, best of {REPEAT} each; calibration {results['calibration_us']:.1f} us):")
+    for name, case in results["cases"].items():
+        line = f"  {name:<34} {case['us']:10.2f} us"
+        base = baseline["cases"].get(name) if baseline else None
+        if base:
+            line += f"   {case['relative'] / base['relative'] - 1:+6.1%} vs baseline"
+        print(line)
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+    
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"FAIL: {line}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
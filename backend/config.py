@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -15,6 +15,122 @@ class Settings(BaseSettings):
     # Serving Configs
     RETAIL_SEARCH_PLACEMENT: str = "default_search"
     
+    # Shared gRPC channels to the Retail API
+    RETAIL_API_ENDPOINT: str = "retail.googleapis.com"
+    # Plaintext, unauthenticated channels; only for local fakes (see benchmarks/fake_retail.py)
+    RETAIL_API_INSECURE: bool = False
+    # Raise for high-concurrency workers to spread streams over more connections
+    RETAIL_CHANNEL_POOL_SIZE: int = 1
+    RETAIL_KEEPALIVE_TIME_SECONDS: float = 30.0
+    RETAIL_KEEPALIVE_TIMEOUT_SECONDS: float = 10.0
+    # Fetch a token and open the channels during startup (credentials are always resolved then)
+    RETAIL_CHANNEL_WARMUP: bool = True
+    RETAIL_CHANNEL_WARMUP_TIMEOUT_SECONDS: float = 5.0
+    
+    # Retail API call deadlines, in seconds: a default and per-RPC overrides
+    RETAIL_RPC_TIMEOUT_SECONDS: float = 10.0
+    RETAIL_RPC_TIMEOUTS: Dict[str, float] = {
+        "search": 5.0,
+        "complete_query": 1.0,
+        "get_product": 2.0,
+        "predict": 3.0
+    }
+    
+    # Hedged requests for idempotent reads (autocomplete, get_product): send a
+    # duplicate once the first attempt is slower than this latency percentile
+    RETAIL_HEDGING_ENABLED: bool = True
+    RETAIL_HEDGE_PERCENTILE: float = 95.0
+    RETAIL_HEDGE_WINDOW: int = 200
+    RETAIL_HEDGE_MIN_SAMPLES: int = 20
+    RETAIL_HEDGE_MIN_DELAY_SECONDS: float = 0.02
+    
+    # Per-RPC circuit breaker: open when RETAIL_CIRCUIT_ERROR_RATE of the last
+    # RETAIL_CIRCUIT_WINDOW calls failed, and fail fast for RETAIL_CIRCUIT_OPEN_SECONDS
+    RETAIL_CIRCUIT_BREAKER_ENABLED: bool = True
+    RETAIL_CIRCUIT_WINDOW: int = 50
+    RETAIL_CIRCUIT_MIN_CALLS: int = 20
+    RETAIL_CIRCUIT_ERROR_RATE: float = 0.5
+    RETAIL_CIRCUIT_OPEN_SECONDS: float = 30.0
+    
+    # Search result hydration (results returned without a title)
+    SEARCH_HYDRATION_CONCURRENCY: int = 10
+    SEARCH_HYDRATION_TIMEOUT_SECONDS: float = 2.0
+    
+    # POST /api/search/multi: searches run at once, and the shared deadline
+    SEARCH_MULTI_CONCURRENCY: int = 5
+    SEARCH_MULTI_TIMEOUT_SECONDS: float = 3.0
+    
+    # Shared (L2) cache behind every in-process cache, for multi-worker deployments:
+    # "none", "sqlite" (one file shared by the workers on a host) or "redis"
+    CACHE_L2_BACKEND: str = "none"
+    CACHE_L2_SQLITE_PATH: str = "/tmp/retail-api-cache.sqlite3"
+    # Threads serving SQLite reads per worker (writes have one thread of their own)
+    CACHE_L2_SQLITE_READ_THREADS: int = 4
+    CACHE_L2_REDIS_URL: str = "redis://localhost:6379/0"
+    # Open connections per worker; further commands wait for one (within the timeout)
+    CACHE_L2_REDIS_MAX_CONNECTIONS: int = 16
+    CACHE_L2_TIMEOUT_SECONDS: float = 0.05
+    # Shared keys are <prefix>:v<version>:<cache>:<key>; bump the version to drop old entries
+    CACHE_KEY_PREFIX: str = "retail-api"
+    CACHE_KEY_VERSION: int = 1
+    
+    # Search response cache (opt-in)
+    SEARCH_CACHE_ENABLED: bool = False
+    SEARCH_CACHE_MAX_ENTRIES: int = 2000
+    SEARCH_CACHE_TTL_SECONDS: float = 30.0
+    SEARCH_CACHE_STALE_SECONDS: float = 120.0
+    # How visitor_id takes part in the key: "by_placement" shares responses across
+    # visitors except on SEARCH_CACHE_PERSONALIZED_PLACEMENTS, where requests with a
+    # visitor_id bypass the cache; also "anonymous_only", "per_visitor" or "ignore"
+    SEARCH_CACHE_VISITOR_POLICY: str = "by_placement"
+    SEARCH_CACHE_PERSONALIZED_PLACEMENTS: List[str] = []
+    # Per-placement TTL overrides, e.g. {"default_search": 60}
+    SEARCH_CACHE_PLACEMENT_TTLS: Dict[str, float] = {}
+    
+    # Search result windows (opt-in): fetch several pages per upstream call and
+    # serve later pages of the same search from memory (per visitor only on
+    # SEARCH_CACHE_PERSONALIZED_PLACEMENTS)
+    SEARCH_WINDOW_ENABLED: bool = False
+    SEARCH_WINDOW_PAGES: int = 5
+    SEARCH_WINDOW_MAX_RESULTS: int = 120  # Retail's largest search page
+    SEARCH_WINDOW_TTL_SECONDS: float = 120.0
+    SEARCH_WINDOW_MAX_ENTRIES: int = 2000
+    # Prefetch the next window once a request reaches its last N pages
+    SEARCH_WINDOW_PREFETCH_PAGES: int = 2
+    
+    # Autocomplete prefix cache
+    AUTOCOMPLETE_CACHE_ENABLED: bool = True
+    AUTOCOMPLETE_CACHE_MAX_ENTRIES: int = 5000
+    AUTOCOMPLETE_CACHE_TTL_SECONDS: float = 300.0
+    
+    # Product detail cache (shared by product lookup and search hydration)
+    PRODUCT_CACHE_MAX_ENTRIES: int = 10000
+    PRODUCT_CACHE_TTL_SECONDS: float = 300.0
+    PRODUCT_CACHE_NEGATIVE_TTL_SECONDS: float = 60.0
+    
+    # Speculative product-detail prefetch for the top search/recommendation results
+    PRODUCT_PREFETCH_ENABLED: bool = False
+    PRODUCT_PREFETCH_TOP_K: int = 4
+    PRODUCT_PREFETCH_CONCURRENCY: int = 4
+    PRODUCT_PREFETCH_MAX_PENDING: int = 100
+    # Skip prefetching while busier than this (HTTP requests / Retail calls in flight)
+    PRODUCT_PREFETCH_MAX_HTTP_IN_FLIGHT: int = 50
+    PRODUCT_PREFETCH_MAX_UPSTREAM_IN_FLIGHT: int = 50
+    
+    # Catalog mirror (serves product lookups and listing from memory)
+    CATALOG_MIRROR_ENABLED: bool = False
+    CATALOG_MIRROR_SNAPSHOT_PATH: Optional[str] = None
+    CATALOG_MIRROR_SYNC_INTERVAL_SECONDS: float = 900.0
+    
+    # Categories cache
+    CATEGORIES_CACHE_TTL_SECONDS: float = 3600.0
+    # Refresh in the background once the cache is this close to expiry
+    CATEGORIES_REFRESH_AHEAD_SECONDS: float = 300.0
+    # Keep serving the last good categories this long past expiry while refreshes fail
+    CATEGORIES_MAX_STALE_SECONDS: float = 86400.0
+    # Retail allows up to 300 facet values
+    CATEGORIES_FACET_LIMIT: int = 300
+    
     # Recommendation Models
     MODEL_RECENTLY_VIEWED: str = "recently_viewed_default"
     MODEL_OTHERS_YOU_MAY_LIKE: str = "others_you_may_like"
@@ -22,10 +138,50 @@ class Settings(BaseSettings):
     MODEL_FREQUENTLY_BOUGHT_TOGETHER: str = "frequently_bought_together"
     MODEL_RECOMMENDED_FOR_YOU: str = "recommended_for_you"
     
+    # Shared deadline for POST /api/recommendations/batch
+    RECOMMENDATIONS_BATCH_TIMEOUT_SECONDS: float = 2.0
+    
+    # Cache for non-personalized models (similar_items, frequently_bought_together)
+    RECOMMENDATIONS_CACHE_ENABLED: bool = True
+    RECOMMENDATIONS_CACHE_MAX_ENTRIES: int = 5000
+    RECOMMENDATIONS_CACHE_TTL_SECONDS: float = 900.0
+    # Products whose recommendations are precomputed, e.g. ["sku-1", "sku-2"]
+    RECOMMENDATIONS_WARM_PRODUCT_IDS: List[str] = []
+    # Keep below the cache TTL so warmed entries never expire
+    RECOMMENDATIONS_WARM_INTERVAL_SECONDS: float = 600.0
+    # Warmed entries serve requests for up to this many results (the frontend asks for 6)
+    RECOMMENDATIONS_WARM_PAGE_SIZE: int = 10
+    RECOMMENDATIONS_WARM_CONCURRENCY: int = 5
+    
     # Server Configuration
     PORT: int = 8080
     ENVIRONMENT: str = "development"
     
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    # Share of requests whose DEBUG detail is logged regardless of LOG_LEVEL
+    LOG_DEBUG_SAMPLE_RATE: float = 0.0
+    
+    # Render hot endpoint responses with orjson, skipping response-model validation
+    FAST_JSON_RESPONSES: bool = False
+    
+    # HTTP caching: path pattern -> Cache-Control for GET routes that get
+    # ETags and If-None-Match/304 handling ("{name}" matches one path segment)
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_RULES: Dict[str, str] = {
+        "/api/products/{product_id}": "public, max-age=60, stale-while-revalidate=300",
+        "/api/categories": "public, max-age=300, stale-while-revalidate=3600",
+        "/api/categories/tree": "public, max-age=300, stale-while-revalidate=3600",
+        "/api/recommendations/models": "public, max-age=3600, stale-while-revalidate=86400"
+    }
+    
+    # Response compression (brotli when installed, else gzip)
+    HTTP_COMPRESSION_ENABLED: bool = True
+    HTTP_COMPRESSION_MIN_BYTES: int = 1024
+    HTTP_GZIP_LEVEL: int = 6
+    HTTP_BROTLI_QUALITY: int = 4
+    
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000"]
     
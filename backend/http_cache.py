@@ -0,0 +1,162 @@
+from starlette.datastructures import Headers, MutableHeaders
+from typing import List, Optional, Tuple
+import gzip
+import hashlib
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # Fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+def cache_rule(method: str, path: str) -> Optional[str]:
+    """Cache-Control value for a GET path from HTTP_CACHE_RULES, or None if not cacheable"""
+    if method != "GET" or not settings.HTTP_CACHE_ENABLED:
+        return None
+    
+    segments = path.rstrip("/").split("/")
+    for pattern, cache_control in settings.HTTP_CACHE_RULES.items():
+        pattern_segments = pattern.rstrip("/").split("/")
+        if len(pattern_segments) == len(segments) and all(
+            expected == actual or (expected.startswith("{") and expected.endswith("}"))
+            for expected, actual in zip(pattern_segments, segments)
+        ):
+            return cache_control
+    return None
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    if not settings.HTTP_COMPRESSION_ENABLED:
+        return None
+    
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.HTTP_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.HTTP_GZIP_LEVEL)
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our (identity) ETag"""
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        candidate = candidate[2:] if candidate.startswith("W/") else candidate
+        # Tags we sent for compressed bodies carry an encoding suffix
+        if candidate.strip('"').split("-", 1)[0] == opaque:
+            return True
+    return False
+
+class HTTPCacheMiddleware:
+    """
+    Conditional GETs, per-route Cache-Control, and negotiated compression.
+    
+    GET responses on paths matching HTTP_CACHE_RULES get a strong ETag over
+    the body and the rule's Cache-Control; a matching If-None-Match is
+    answered with 304 and no body. Compressible responses of at least
+    HTTP_COMPRESSION_MIN_BYTES are sent with brotli or gzip, as the client
+    accepts. Streaming responses (no Content-Length) pass through untouched.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_headers = Headers(scope=scope)
+        cache_control = cache_rule(scope["method"], scope["path"])
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if cache_control is None and encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start = {}
+        chunks: List[bytes] = []
+        
+        async def send_buffered(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if "content-length" in headers and "content-encoding" not in headers:
+                    start["message"] = message
+                    return
+                await send(message)
+                return
+            
+            if message["type"] != "http.response.body" or "message" not in start:
+                await send(message)
+                return
+            
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            for outgoing in self._finish(start.pop("message"), b"".join(chunks), request_headers, cache_control, encoding):
+                await send(outgoing)
+        
+        await self.app(scope, receive, send_buffered)
+    
+    def _finish(
+        self,
+        start: dict,
+        body: bytes,
+        request_headers: Headers,
+        cache_control: Optional[str],
+        encoding: Optional[str]
+    ) -> Tuple[dict, dict]:
+        """Build the final start and body messages"""
+        headers = MutableHeaders(raw=start["headers"])
+        
+        compressible = settings.HTTP_COMPRESSION_ENABLED and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        if not compressible or len(body) < settings.HTTP_COMPRESSION_MIN_BYTES:
+            encoding = None
+        
+        if cache_control is not None and start["status"] == 200:
+            etag = make_etag(body)
+            # A compressed body is a different representation, so it needs a different strong tag
+            headers["etag"] = f'{etag[:-1]}-{encoding}"' if encoding else etag
+            if "cache-control" not in headers:
+                headers["cache-control"] = cache_control
+            
+            if etag_matches(request_headers.get("if-none-match", ""), etag):
+                del headers["content-length"]
+                if "content-type" in headers:
+                    del headers["content-type"]
+                start["status"] = 304
+                return start, {"type": "http.response.body", "body": b""}
+        
+        if encoding is not None:
+            body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+        
+        return start, {"type": "http.response.body", "body": body}
@@ -0,0 +1,155 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+
+from config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Correlation ID of the request being handled; "-" outside of requests
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Whether the current request was sampled for verbose (DEBUG) detail
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=False)
+
+_listener: Optional[QueueListener] = None
+
+# The app's own loggers; with debug sampling on only these log at DEBUG, so
+# sampled requests do not also carry grpc, google.auth or httpx internals
+APP_LOGGERS = ("__main__", "main", "config", "http_cache", "logging_config", "metrics", "responses", "routers", "services")
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the request ID and drop unsampled debug detail.
+    
+    Runs on the caller's side of the queue, where the request context is visible.
+    """
+    
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level and not debug_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now, while its arguments still hold their values
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from extra={"fields": {...}}"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with structured fields appended as key=value"""
+    
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+def setup_logging():
+    """
+    Route all logging through a queue drained by a background thread.
+    
+    Records at LOG_LEVEL and above are always kept; DEBUG detail from the
+    app's own loggers is kept only for the share of requests picked by
+    LOG_DEBUG_SAMPLE_RATE. Third-party loggers stay at LOG_LEVEL.
+    """
+    global _listener
+    
+    if _listener is not None:
+        return
+    
+    level = logging.getLevelName(settings.LOG_LEVEL.upper())
+    
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter(level))
+    
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    app_level = logging.DEBUG if settings.LOG_DEBUG_SAMPLE_RATE > 0 else logging.NOTSET
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(app_level)
+    
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestContextMiddleware:
+    """Assign each request a correlation ID and decide whether it is debug-sampled"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+        
+        request_id_token = request_id_var.set(request_id)
+        sampled_token = debug_sampled_var.set(random.random() < settings.LOG_DEBUG_SAMPLE_RATE)
+        
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.lower().encode("latin-1"), request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(request_id_token)
+            debug_sampled_var.reset(sampled_token)
@@ -1,21 +1,48 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import logging
 import uvicorn
 
 from config import settings
+from logging_config import setup_logging, shutdown_logging, RequestContextMiddleware
+from metrics import registry, MetricsMiddleware
+from http_cache import HTTPCacheMiddleware
 from routers import search_router, products_router, recommendations_router, categories_router
+from services.catalog_mirror import catalog_mirror
+from services.products_service import products_service
+from services.categories_service import categories_service
+from services.recommendations_service import recommendations_service
+from services.resilience import retail_upstream
+from services.retail_clients import retail_clients
+from services.cache_store import close_store
+
+logger = logging.getLogger(__name__)
 
 # Lifespan context manager for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print(f"🚀 Starting Retail API Backend")
-    print(f"📊 Environment: {settings.ENVIRONMENT}")
-    print(f"🔧 GCP Project: {settings.GCP_PROJECT_ID}")
+    setup_logging()
+    logger.info("Starting Retail API Backend", extra={"fields": {
+        "environment": settings.ENVIRONMENT,
+        "gcp_project": settings.GCP_PROJECT_ID
+    }})
+    await retail_clients.warmup()
+    categories_service.warm()
+    if settings.CATALOG_MIRROR_ENABLED:
+        await catalog_mirror.start(products_service.iter_product_dicts)
+    if settings.RECOMMENDATIONS_CACHE_ENABLED and settings.RECOMMENDATIONS_WARM_PRODUCT_IDS:
+        recommendations_service.start_warmer()
     yield
     # Shutdown
-    print("👋 Shutting down Retail API Backend")
+    await catalog_mirror.stop()
+    await recommendations_service.stop_warmer()
+    await retail_clients.close()
+    await close_store()
+    logger.info("Shutting down Retail API Backend")
+    shutdown_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -25,6 +52,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# ETags, Cache-Control and compression (innermost, so metrics include compression time)
+app.add_middleware(HTTPCacheMiddleware)
+
+# Request latency metrics and Server-Timing header
+app.add_middleware(MetricsMiddleware)
+
+# Request correlation IDs and debug-log sampling
+app.add_middleware(RequestContextMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -40,9 +76,15 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "retail-api-backend",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "upstream": retail_upstream.status()
     }
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(search_router, prefix="/api/search", tags=["Search"])
 app.include_router(products_router, prefix="/api/products", tags=["Products"])
@@ -0,0 +1,266 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import bisect
+import time
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request stage timings (stage -> seconds), read by the Server-Timing middleware
+request_timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    """Monotonic counter with labels"""
+    
+    type_name = "counter"
+    
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+    
+    def total(self) -> float:
+        """Sum over all label values"""
+        return sum(self._values.values())
+    
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, values)} {value}"
+            for values, value in self._values.items()
+        ]
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    
+    type_name = "gauge"
+    
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+    
+    def set(self, *label_values: str, value: float):
+        self._values[label_values] = value
+
+class CallbackGauge(Gauge):
+    """Unlabeled gauge read from a function at scrape time; None means no sample"""
+    
+    def __init__(self, name: str, help: str, read: Callable[[], Optional[float]]):
+        super().__init__(name, help)
+        self._read = read
+    
+    def samples(self) -> List[str]:
+        value = self._read()
+        return [] if value is None else [f"{self.name} {value}"]
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, *label_values: str, value: float):
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+    
+    def samples(self) -> List[str]:
+        lines = []
+        for values, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+class Registry:
+    """Holds metrics and cache stats sources, and renders the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+    
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        """Expose a cache's stats() counters as cache_* metrics"""
+        self._caches[name] = stats
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        lines.extend(self._render_caches())
+        return "\n".join(lines) + "\n"
+    
+    def _render_caches(self) -> List[str]:
+        families = {
+            "cache_hits_total": ("counter", "Cache lookups served from the cache", "hits"),
+            "cache_stale_hits_total": ("counter", "Cache lookups served stale", "stale_hits"),
+            "cache_misses_total": ("counter", "Cache lookups that missed", "misses"),
+            "cache_evictions_total": ("counter", "Entries evicted to stay within the size bound", "evictions"),
+            "cache_l2_hits_total": ("counter", "In-process misses served from the shared cache", "l2_hits"),
+            "cache_l2_errors_total": ("counter", "Shared cache reads and writes that failed or timed out", "l2_errors"),
+            "cache_entries": ("gauge", "Entries currently cached", "entries"),
+            "cache_hit_ratio": ("gauge", "Share of lookups served from the cache", "hit_ratio")
+        }
+        stats = {name: source() for name, source in self._caches.items()}
+        
+        lines = []
+        for family, (type_name, help, key) in families.items():
+            lines.append(f"# HELP {family} {help}")
+            lines.append(f"# TYPE {family} {type_name}")
+            for cache, values in stats.items():
+                if key in values:
+                    lines.append(f'{family}{{cache="{cache}"}} {values[key]}')
+        return lines
+
+registry = Registry()
+
+http_request_duration = registry.add(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    labels=("router", "handler", "method", "status")
+))
+http_requests_in_flight = registry.add(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being handled",
+    labels=("router",)
+))
+upstream_duration = registry.add(Histogram(
+    "retail_upstream_duration_seconds",
+    "Retail API call latency",
+    labels=("rpc", "target", "status")
+))
+upstream_in_flight = registry.add(Gauge(
+    "retail_upstream_in_flight",
+    "Retail API calls in flight",
+    labels=("rpc",)
+))
+
+def record_stage(stage: str, seconds: float):
+    """Add time to a stage of the current request's Server-Timing breakdown"""
+    timings = request_timings_var.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+def mark_handler_done():
+    """Note when the endpoint produced its data; the rest until the response starts is serialization"""
+    timings = request_timings_var.get()
+    if timings is not None:
+        timings["_handler_done"] = time.perf_counter()
+
+@asynccontextmanager
+async def track_upstream(rpc: str, target: str):
+    """Time one Retail API call, labeled by RPC, placement/serving config and status"""
+    upstream_in_flight.inc(rpc)
+    started = time.perf_counter()
+    status = "OK"
+    try:
+        yield
+    except asyncio.CancelledError:
+        status = "CANCELLED"
+        raise
+    except Exception as e:
+        code = getattr(e, "grpc_status_code", None)
+        status = code.name if code is not None else type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_in_flight.dec(rpc)
+        upstream_duration.observe(rpc, target, status, value=elapsed)
+        record_stage("upstream", elapsed)
+
+def _router_label(path: str) -> str:
+    """First segment under /api (or the first segment) of a path"""
+    parts = path.strip("/").split("/")
+    return parts[1] if len(parts) > 1 and parts[0] == "api" else parts[0] or "root"
+
+class MetricsMiddleware:
+    """
+    Record request latency and in-flight counts, and emit a Server-Timing header.
+    
+    The router label is only taken from the request path when it names one of
+    the app's routes; anything else is counted as "unmatched", so unknown URLs
+    cannot create new series.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self._routers: Optional[Set[str]] = None
+    
+    def _known_routers(self, app) -> Set[str]:
+        # Routes are all registered before the first request, so this is built once
+        if self._routers is None:
+            self._routers = {_router_label(route.path) for route in getattr(app, "routes", []) if hasattr(route, "path")}
+        return self._routers
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        router = _router_label(scope["path"])
+        if router not in self._known_routers(scope.get("app")):
+            router = "unmatched"
+        
+        timings: Dict[str, float] = {}
+        token = request_timings_var.set(timings)
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                now = time.perf_counter()
+                handler_done = timings.pop("_handler_done", None)
+                if handler_done is not None:
+                    timings["serialization"] = now - handler_done
+                timings["total"] = now - started
+                
+                entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+        
+        http_requests_in_flight.inc(router)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_requests_in_flight.dec(router)
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "unmatched")
+            http_request_duration.observe(router, handler, scope["method"], str(status[0]), value=time.perf_counter() - started)
+            request_timings_var.reset(token)
@@ -10,6 +10,12 @@ class SearchRequest(BaseModel):
     filter: str = ""
     order_by: str = ""
     facet_specs: Optional[List[Dict[str, Any]]] = None
+    fields: Optional[List[str]] = None  # Product fields to return, e.g. ["id", "title", "price_info", "images"]
+
+class SearchMultiRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_length=1, max_length=20)
+    # Shared deadline for the whole batch; SEARCH_MULTI_TIMEOUT_SECONDS when unset
+    timeout_seconds: Optional[float] = Field(default=None, gt=0, le=30)
 
 class AutocompleteRequest(BaseModel):
     query: str
@@ -24,6 +30,15 @@ class RecommendationsRequest(BaseModel):
     page_size: int = Field(default=10, ge=1, le=50)
     filter: str = ""
     params: Optional[Dict[str, Any]] = None
+    fields: Optional[List[str]] = None  # Product fields to return
+
+class RecommendationsBatchRequest(BaseModel):
+    requests: List[RecommendationsRequest] = Field(..., min_length=1, max_length=10)
+    # Defaults applied to requests that leave them unset
+    visitor_id: Optional[str] = None
+    product_id: Optional[str] = None
+    # Shared deadline for the whole batch; RECOMMENDATIONS_BATCH_TIMEOUT_SECONDS when unset
+    timeout_seconds: Optional[float] = Field(default=None, gt=0, le=30)
 
 # Products Models
 class ProductListRequest(BaseModel):
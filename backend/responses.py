@@ -0,0 +1,33 @@
+from fastapi.responses import JSONResponse
+from typing import Any, Union
+import json
+
+from config import settings
+from models import APIResponse
+from metrics import mark_handler_done
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed"""
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def api_response(data: Any = None) -> Union[APIResponse, FastJSONResponse]:
+    """
+    Build the success envelope for an endpoint.
+    
+    With FAST_JSON_RESPONSES the envelope is rendered directly, which skips
+    FastAPI's response-model validation and jsonable_encoder pass. The route's
+    response_model still documents the envelope in OpenAPI.
+    """
+    mark_handler_done()
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse({"success": True, "data": data, "error": None})
+    return APIResponse(success=True, data=data)
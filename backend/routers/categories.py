@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from google.api_core import exceptions
+from typing import Optional
 
 from models import APIResponse
 from services.categories_service import categories_service
@@ -14,5 +16,25 @@ async def get_categories():
         categories = await categories_service.get_categories()
         return APIResponse(success=True, data=categories)
     
+    except exceptions.ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=e.message)
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tree", response_model=APIResponse)
+async def get_category_tree(
+    path: Optional[str] = Query(None, description='Category path, e.g. "Tools > Power Tools"; omit for the whole tree')
+):
+    """
+    Get the category hierarchy with rolled-up product counts
+    """
+    try:
+        tree = await categories_service.get_category_tree(path)
+    except exceptions.ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=e.message)
+    
+    if tree is None:
+        raise HTTPException(status_code=404, detail=f"Category not found: {path}")
+    
+    return APIResponse(success=True, data=tree)
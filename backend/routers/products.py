@@ -1,19 +1,47 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from google.api_core import exceptions
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
+from config import settings
 from models import APIResponse
+from responses import api_response
 from services.products_service import products_service
+from services.product_cache import product_cache
+from services.product_prefetch import product_prefetcher
+from services.catalog_mirror import catalog_mirror
+from services.resilience import CircuitOpenError
+from services.product_converter import parse_fields
 
 router = APIRouter()
 
+@router.get("/export")
+async def export_products(
+    filter: str = Query(""),
+    page_size: int = Query(1000, ge=1, le=1000)
+):
+    """
+    Stream the whole catalog as NDJSON, one product per line
+    """
+    return StreamingResponse(
+        products_service.export_products_ndjson(filter=filter, page_size=page_size),
+        media_type="application/x-ndjson"
+    )
+
 @router.get("/{product_id}", response_model=APIResponse)
-async def get_product(product_id: str):
+async def get_product(
+    product_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return")
+):
     """
     Get a single product by ID
     """
     try:
-        product = await products_service.get_product(product_id)
-        return APIResponse(success=True, data=product)
+        product = await products_service.get_product(product_id, fields=parse_fields(fields))
+        return api_response(product)
+    
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Product not found: {str(e)}")
@@ -22,19 +50,79 @@ async def get_product(product_id: str):
 async def list_products(
     page_size: int = Query(20, ge=1, le=100),
     page_token: str = Query(""),
-    filter: str = Query("")
+    filter: str = Query(""),
+    categories: Optional[List[str]] = Query(None, description="Catalog mirror only"),
+    brands: Optional[List[str]] = Query(None, description="Catalog mirror only"),
+    availability: Optional[str] = Query(None, description="Catalog mirror only"),
+    min_price: Optional[float] = Query(None, description="Catalog mirror only"),
+    max_price: Optional[float] = Query(None, description="Catalog mirror only"),
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return")
 ):
     """
     List products with optional filtering
+    
+    categories, brands, availability and the price bounds need the catalog
+    mirror; they are rejected with 400 when it is off or a filter is given.
     """
     try:
         results = await products_service.list_products(
             page_size=page_size,
             page_token=page_token,
-            filter=filter
+            filter=filter,
+            categories=categories,
+            brands=brands,
+            availability=availability,
+            min_price=min_price,
+            max_price=max_price,
+            fields=parse_fields(fields)
         )
         
-        return APIResponse(success=True, data=results)
+        return api_response(results)
+    
+    except exceptions.InvalidArgument as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    
+    except exceptions.ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=e.message)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats", response_model=APIResponse)
+async def get_product_cache_stats():
+    """
+    Get product cache counters
+    """
+    return APIResponse(success=True, data=product_cache.stats())
+
+@router.get("/prefetch/stats", response_model=APIResponse)
+async def get_product_prefetch_stats():
+    """
+    Get speculative product prefetch counters
+    """
+    return APIResponse(success=True, data=product_prefetcher.stats())
+
+@router.delete("/cache/{product_id}", response_model=APIResponse)
+async def invalidate_cached_product(product_id: str):
+    """
+    Drop a product from the product cache
+    """
+    return APIResponse(success=True, data={"invalidated": await product_cache.invalidate(product_id)})
+
+@router.get("/mirror/status", response_model=APIResponse)
+async def get_mirror_status():
+    """
+    Get catalog mirror sync state and lag
+    """
+    return APIResponse(success=True, data=catalog_mirror.status())
+
+@router.post("/mirror/reload", response_model=APIResponse)
+async def reload_mirror():
+    """
+    Re-sync the catalog mirror from the Retail API
+    """
+    if not settings.CATALOG_MIRROR_ENABLED:
+        raise HTTPException(status_code=400, detail="Catalog mirror is not enabled")
+    
+    status = await catalog_mirror.sync()
+    return APIResponse(success=status["last_sync_error"] is None, data=status, error=status["last_sync_error"])
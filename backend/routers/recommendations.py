@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 
-from models import RecommendationsRequest, APIResponse
+from config import settings
+from models import RecommendationsRequest, RecommendationsBatchRequest, APIResponse
+from responses import api_response
 from services.recommendations_service import recommendations_service
+from services.recommendations_cache import recommendations_cache
+from services.product_converter import parse_fields
+from services.product_prefetch import product_prefetcher
 
 router = APIRouter()
 
 @router.post("", response_model=APIResponse)
-async def get_recommendations(request: RecommendationsRequest):
+async def get_recommendations(request: RecommendationsRequest, background_tasks: BackgroundTasks):
     """
     Get product recommendations
     """
@@ -17,10 +22,43 @@ async def get_recommendations(request: RecommendationsRequest):
             product_id=request.product_id,
             page_size=request.page_size,
             filter=request.filter,
-            params=request.params
+            params=request.params,
+            fields=parse_fields(request.fields)
         )
         
-        return APIResponse(success=True, data=results)
+        # Warm the product cache for the results users are likely to open next
+        background_tasks.add_task(product_prefetcher.prefetch, results.get("results", []))
+        
+        return api_response(results)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch", response_model=APIResponse)
+async def get_recommendations_batch(request: RecommendationsBatchRequest):
+    """
+    Get recommendations from several models in one call
+    """
+    try:
+        requests = [
+            {
+                "model": item.model,
+                "visitor_id": item.visitor_id or request.visitor_id,
+                "product_id": item.product_id or request.product_id,
+                "page_size": item.page_size,
+                "filter": item.filter,
+                "params": item.params,
+                "fields": parse_fields(item.fields)
+            }
+            for item in request.requests
+        ]
+        
+        results = await recommendations_service.get_recommendations_batch(
+            requests=requests,
+            timeout_seconds=request.timeout_seconds or settings.RECOMMENDATIONS_BATCH_TIMEOUT_SECONDS
+        )
+        
+        return api_response(results)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -36,3 +74,13 @@ async def get_models():
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats", response_model=APIResponse)
+async def get_cache_stats():
+    """
+    Get recommendations cache and warmer counters
+    """
+    return APIResponse(
+        success=True,
+        data={**recommendations_cache.stats(), "warmer": recommendations_service.warmer_status()}
+    )
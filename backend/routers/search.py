@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from typing import Optional
 
-from models import SearchRequest, AutocompleteRequest, APIResponse
+from config import settings
+from models import SearchRequest, SearchMultiRequest, AutocompleteRequest, APIResponse
+from responses import api_response
 from services.retail_search_service import retail_search_service
+from services.search_cache import search_cache
+from services.search_window import search_window
+from services.autocomplete_cache import autocomplete_cache
+from services.product_converter import parse_fields
+from services.product_prefetch import product_prefetcher
 
 router = APIRouter()
 
 @router.post("", response_model=APIResponse)
-async def search(request: SearchRequest):
+async def search(request: SearchRequest, background_tasks: BackgroundTasks):
     """
     Execute a search query
     """
@@ -19,10 +26,45 @@ async def search(request: SearchRequest):
             offset=request.offset,
             filter=request.filter,
             order_by=request.order_by,
-            facet_specs=request.facet_specs
+            facet_specs=request.facet_specs,
+            fields=parse_fields(request.fields)
         )
         
-        return APIResponse(success=True, data=results)
+        # Warm the product cache for the results users are likely to open next
+        background_tasks.add_task(product_prefetcher.prefetch, results.get("results", []))
+        
+        return api_response(results)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/multi", response_model=APIResponse)
+async def search_multi(request: SearchMultiRequest):
+    """
+    Execute several search queries in one call
+    """
+    try:
+        searches = [
+            {
+                "query": item.query,
+                "visitor_id": item.visitor_id,
+                "page_size": item.page_size,
+                "offset": item.offset,
+                "filter": item.filter,
+                "order_by": item.order_by,
+                "facet_specs": item.facet_specs,
+                "fields": parse_fields(item.fields)
+            }
+            for item in request.searches
+        ]
+        
+        results = await retail_search_service.search_multi(
+            searches=searches,
+            concurrency=settings.SEARCH_MULTI_CONCURRENCY,
+            timeout_seconds=request.timeout_seconds or settings.SEARCH_MULTI_TIMEOUT_SECONDS
+        )
+        
+        return api_response(results)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -43,7 +85,28 @@ async def autocomplete(
             max_suggestions=max_suggestions
         )
         
-        return APIResponse(success=True, data=results)
+        return api_response(results)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats", response_model=APIResponse)
+async def get_search_cache_stats():
+    """
+    Get search response cache counters
+    """
+    return APIResponse(success=True, data=search_cache.stats())
+
+@router.get("/window/stats", response_model=APIResponse)
+async def get_search_window_stats():
+    """
+    Get search result window counters
+    """
+    return APIResponse(success=True, data=search_window.stats())
+
+@router.get("/autocomplete/cache/stats", response_model=APIResponse)
+async def get_autocomplete_cache_stats():
+    """
+    Get autocomplete cache counters
+    """
+    return APIResponse(success=True, data=autocomplete_cache.stats())
@@ -0,0 +1,103 @@
+from typing import Any, Dict, Optional
+
+from config import settings
+from metrics import registry
+from services.cache import TieredCache
+
+class AutocompleteCache:
+    """
+    Prefix-aware autocomplete cache.
+    
+    Responses are stored per normalized prefix. A response that returned fewer
+    suggestions than were asked for holds every suggestion for that prefix, so
+    longer prefixes typed afterwards are answered by filtering it locally.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        # prefix -> {"max_suggestions": int, "response": dict}
+        self._cache = TieredCache("autocomplete", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+    
+    async def get(self, query: str, max_suggestions: int) -> Optional[Dict[str, Any]]:
+        """Answer from the cache, or return None if the Retail API must be called"""
+        
+        prefix = self._normalize(query)
+        if not prefix:
+            return None
+        
+        entry = await self._cache.get(prefix)
+        if entry is not None and (self._is_complete(entry) or entry["max_suggestions"] >= max_suggestions):
+            self.hits += 1
+            return self._truncate(entry["response"], max_suggestions)
+        
+        # Longest cached shorter prefix that holds every suggestion for itself
+        # (L1 only: one shared-store round trip per prefix would cost more than the call)
+        for end in range(len(prefix) - 1, 0, -1):
+            entry = self._cache.get_local(prefix[:end])
+            if entry is not None and self._is_complete(entry):
+                self.prefix_hits += 1
+                return self._filter(entry["response"], prefix, max_suggestions)
+        
+        self.misses += 1
+        return None
+    
+    def set(self, query: str, max_suggestions: int, response: Dict[str, Any]) -> None:
+        """Store the Retail API response for a prefix"""
+        
+        prefix = self._normalize(query)
+        if prefix:
+            self._cache.set(prefix, {"max_suggestions": max_suggestions, "response": response})
+    
+    def clear(self):
+        """Drop all cached prefixes"""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        lookups = self.hits + self.prefix_hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "max_entries": self._cache.local.max_entries,
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.prefix_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self._cache.local.evictions,
+            "expirations": self._cache.local.expirations,
+            "l2_hits": self._cache.l2_hits,
+            "l2_errors": self._cache.l2_errors
+        }
+    
+    def _normalize(self, query: str) -> str:
+        return " ".join(query.split()).lower()
+    
+    def _is_complete(self, entry: Dict[str, Any]) -> bool:
+        return len(entry["response"]["suggestions"]) < entry["max_suggestions"]
+    
+    def _truncate(self, response: Dict[str, Any], max_suggestions: int) -> Dict[str, Any]:
+        return {
+            "suggestions": response["suggestions"][:max_suggestions],
+            "attribution_token": response["attribution_token"]
+        }
+    
+    def _filter(self, response: Dict[str, Any], prefix: str, max_suggestions: int) -> Dict[str, Any]:
+        """Keep suggestions where the prefix starts the suggestion or one of its words"""
+        needle = " " + prefix
+        suggestions = [
+            s for s in response["suggestions"]
+            if needle in " " + " ".join(s["suggestion"].split()).lower()
+        ]
+        return {
+            "suggestions": suggestions[:max_suggestions],
+            "attribution_token": response["attribution_token"]
+        }
+
+# Singleton instance
+autocomplete_cache = AutocompleteCache(
+    max_entries=settings.AUTOCOMPLETE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTOCOMPLETE_CACHE_TTL_SECONDS
+)
+registry.register_cache("autocomplete", autocomplete_cache.stats)
@@ -0,0 +1,297 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Hashable, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import struct
+import time
+
+from config import settings
+from services.cache_store import get_store, namespace_prefix, shared_key
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a TTL.
+    
+    Entries can optionally outlive their TTL by a stale window, during which
+    lookup() still returns them flagged as stale so callers can serve the old
+    value while refreshing it.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float, stale_seconds: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        # key -> (value, fresh_until, expires_at); ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or past its TTL"""
+        entry = self._find(key)
+        
+        if entry is None or entry[1] <= time.monotonic():
+            self.misses += 1
+            return default
+        
+        self.hits += 1
+        return entry[0]
+    
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """Return (value, is_stale), or None if missing or past its stale window"""
+        entry = self._find(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        if entry[1] <= time.monotonic():
+            self.stale_hits += 1
+            return entry[0], True
+        
+        self.hits += 1
+        return entry[0], False
+    
+    def _find(self, key: Hashable) -> Optional[tuple]:
+        """Get the live entry for key, dropping it if past its stale window"""
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            return None
+        
+        if entry[2] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        return entry
+    
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None
+    ) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        if self.max_entries <= 0:
+            return
+        
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        stale = self.stale_seconds if stale_seconds is None else stale_seconds
+        fresh_until = time.monotonic() + ttl
+        self._entries[key] = (value, fresh_until, fresh_until + stale)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry; returns True if it was cached"""
+        return self._entries.pop(key, None) is not None
+    
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether key has a fresh entry; does not count as a lookup"""
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class JSONCodec:
+    """Serializes JSON-compatible values; orjson when installed"""
+    
+    def dumps(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+    
+    def loads(self, data: memoryview) -> Any:
+        # orjson parses the buffer in place; the stdlib parser needs bytes
+        return orjson.loads(data) if orjson is not None else json.loads(bytes(data))
+
+# Shared-store entry header: fresh_until and expires_at as wall-clock seconds
+_HEADER = struct.Struct("<dd")
+
+class TieredCache:
+    """
+    TTLCache (L1) in front of the optional shared store (L2) chosen by CACHE_L2_BACKEND.
+    
+    L1 holds live objects, so hits cost no deserialization. Writes go to L1 at
+    once and to L2 in the background; an L1 miss checks L2 and copies a hit
+    into L1 with the entry's remaining fresh/stale time, so every worker on a
+    host (SQLite) or in a deployment (Redis) shares upstream results. L2
+    errors and timeouts count as misses.
+    """
+    
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int,
+        ttl_seconds: float,
+        stale_seconds: float = 0.0,
+        codec: Any = None
+    ):
+        self.namespace = namespace
+        self.local = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, stale_seconds=stale_seconds)
+        self.codec = codec or JSONCodec()
+        self._writes: Set[asyncio.Future] = set()
+        
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+    
+    async def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return (value, is_stale), or None if missing or past its stale window in both tiers"""
+        found = self.local.lookup(key)
+        if found is not None:
+            return found
+        return await self.lookup_shared(key)
+    
+    async def get(self, key: str, default: Any = None) -> Any:
+        """Return the fresh cached value, or default"""
+        found = await self.lookup(key)
+        if found is None or found[1]:
+            return default
+        return found[0]
+    
+    def get_local(self, key: str, default: Any = None) -> Any:
+        """Return the fresh value from L1 only, without waiting on L2"""
+        return self.local.get(key, default)
+    
+    async def lookup_shared(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Look up L2 only, copying a hit into L1"""
+        store = get_store()
+        if store is None:
+            return None
+        
+        try:
+            raw = await asyncio.wait_for(store.get(shared_key(self.namespace, key)), settings.CACHE_L2_TIMEOUT_SECONDS)
+            if raw is None:
+                self.l2_misses += 1
+                return None
+            fresh_until, expires_at = _HEADER.unpack_from(raw)
+            value = self.codec.loads(memoryview(raw)[_HEADER.size:])
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning("Shared cache read error: %s", e, extra={"fields": {"cache": self.namespace}})
+            return None
+        
+        now = time.time()
+        if expires_at <= now:
+            self.l2_misses += 1
+            return None
+        
+        self.l2_hits += 1
+        fresh = max(0.0, fresh_until - now)
+        self.local.set(key, value, ttl_seconds=fresh, stale_seconds=expires_at - now - fresh)
+        return value, fresh == 0.0
+    
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None
+    ) -> None:
+        """Store a value in L1, and in L2 in the background"""
+        self.local.set(key, value, ttl_seconds=ttl_seconds, stale_seconds=stale_seconds)
+        
+        store = get_store()
+        if store is None:
+            return
+        
+        ttl = self.local.ttl_seconds if ttl_seconds is None else ttl_seconds
+        stale = self.local.stale_seconds if stale_seconds is None else stale_seconds
+        now = time.time()
+        try:
+            payload = self.codec.dumps(value)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning("Shared cache encode error: %s", e, extra={"fields": {"cache": self.namespace}})
+            return
+        
+        # The header goes in its own chunk so the payload is never copied to prepend it
+        chunks = (_HEADER.pack(now + ttl, now + ttl + stale), payload)
+        self._background(store.set(shared_key(self.namespace, key), chunks, ttl + stale))
+    
+    def contains(self, key: str) -> bool:
+        """Whether L1 has a fresh entry for key"""
+        return key in self.local
+    
+    async def invalidate(self, key: str) -> bool:
+        """Drop an entry from both tiers; returns True if it was in L1"""
+        dropped = self.local.invalidate(key)
+        store = get_store()
+        if store is not None:
+            try:
+                await asyncio.wait_for(store.delete(shared_key(self.namespace, key)), settings.CACHE_L2_TIMEOUT_SECONDS)
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning("Shared cache delete error: %s", e, extra={"fields": {"cache": self.namespace}})
+        return dropped
+    
+    def clear(self) -> None:
+        """Drop all entries; the shared namespace is cleared in the background"""
+        self.local.clear()
+        store = get_store()
+        if store is not None:
+            self._background(store.clear(namespace_prefix(self.namespace)))
+    
+    def _background(self, operation: Awaitable[None]) -> None:
+        async def run():
+            try:
+                await asyncio.wait_for(operation, settings.CACHE_L2_TIMEOUT_SECONDS * 10)
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning("Shared cache write error: %s", e, extra={"fields": {"cache": self.namespace}})
+        
+        task = asyncio.ensure_future(run())
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+    
+    def __len__(self) -> int:
+        return len(self.local)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get L1 counters plus L2 hits, misses and errors"""
+        stats = self.local.stats()
+        store = get_store()
+        stats["l2"] = store.name if store is not None else None
+        stats["l2_hits"] = self.l2_hits
+        stats["l2_misses"] = self.l2_misses
+        stats["l2_errors"] = self.l2_errors
+        return stats
@@ -0,0 +1,289 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def shared_key(namespace: str, key: str) -> str:
+    """Key of an entry in the shared store: <prefix>:v<version>:<namespace>:<key>"""
+    return f"{settings.CACHE_KEY_PREFIX}:v{settings.CACHE_KEY_VERSION}:{namespace}:{key}"
+
+def namespace_prefix(namespace: str) -> str:
+    return shared_key(namespace, "")
+
+class CacheStore:
+    """
+    Shared (L2) cache store interface.
+    
+    Values are written as a sequence of byte chunks so callers can prepend a
+    header without joining it onto a large payload; stores that can send the
+    chunks as they are do so. Reads return one bytes object.
+    """
+    
+    name = "none"
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+    
+    async def set(self, key: str, chunks: Sequence[bytes], ttl_seconds: float) -> None:
+        raise NotImplementedError
+    
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+    
+    async def clear(self, prefix: str) -> None:
+        """Delete every key starting with prefix"""
+        raise NotImplementedError
+    
+    async def close(self) -> None:
+        pass
+
+class SQLiteStore(CacheStore):
+    """
+    SQLite file shared by the workers on one host.
+    
+    Runs in WAL mode so readers do not block the writer. Each thread has its
+    own connection, and the calls run on the store's own threads rather than
+    asyncio's default executor: one writer (SQLite takes one writer at a time
+    anyway) and read_threads readers, so a read never queues behind a write
+    waiting on another process's lock. A call whose caller has given up before
+    it started is dropped. Expired rows are skipped on read and purged every
+    PURGE_EVERY writes.
+    """
+    
+    name = "sqlite"
+    PURGE_EVERY = 1000
+    
+    def __init__(self, path: str, read_threads: int, busy_timeout_seconds: float):
+        self.path = path
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_threads), thread_name_prefix="cache-sqlite-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-sqlite-write")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_seconds, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _set(self, key: str, chunks: Sequence[bytes], ttl_seconds: float) -> None:
+        value = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl_seconds)
+        )
+        # Only the writer thread gets here, so the counter needs no lock
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+    
+    def _execute(self, sql: str, params: Tuple[Any, ...]) -> None:
+        self._connection().execute(sql, params)
+    
+    async def _run(self, executor: ThreadPoolExecutor, fn: Callable[..., Any], *args: Any) -> Any:
+        # Cancelling the awaiting caller (e.g. on timeout) cancels the call if it has not started
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._readers, self._get, key)
+    
+    async def set(self, key: str, chunks: Sequence[bytes], ttl_seconds: float) -> None:
+        await self._run(self._writer, self._set, key, chunks, ttl_seconds)
+    
+    async def delete(self, key: str) -> None:
+        await self._run(self._writer, self._execute, "DELETE FROM cache WHERE key = ?", (key,))
+    
+    async def clear(self, prefix: str) -> None:
+        # A key range rather than LIKE: LIKE is case-insensitive and treats "_" in
+        # names such as search_window as a wildcard. Keys compare bytewise, and
+        # UTF-8 preserves code point order, so this is exactly the prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        await self._run(self._writer, self._execute, "DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, upper))
+    
+    async def close(self) -> None:
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=False, cancel_futures=True)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+def _glob_escape(text: str) -> str:
+    """Escape Redis glob metacharacters, e.g. in an operator-set CACHE_KEY_PREFIX"""
+    return "".join("\\" + char if char in "*?[]\\" else char for char in text)
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+class RedisStore(CacheStore):
+    """
+    Minimal client for a Redis-protocol (RESP2) server.
+    
+    Speaks only the commands the cache needs (GET, SET PX, DEL, SCAN, plus
+    AUTH/SELECT from the URL), so any RESP server or local stand-in works.
+    Connections are pooled; each carries one command at a time, and at most
+    max_connections are open. Commands beyond that wait for a free connection
+    (within the caller's timeout) instead of opening new ones.
+    """
+    
+    name = "redis"
+    
+    def __init__(self, url: str, max_connections: int):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.strip("/") or 0)
+        self.max_connections = max(1, max_connections)
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+    
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = (reader, writer)
+        if self.password:
+            await self._roundtrip(connection, [b"AUTH", self.password.encode()])
+        if self.db:
+            await self._roundtrip(connection, [b"SELECT", str(self.db).encode()])
+        return connection
+    
+    async def command(self, *args: Any) -> Any:
+        """Send one command and return its decoded reply"""
+        parts = []
+        for arg in args:
+            if isinstance(arg, (list, tuple)):
+                # A value given as chunks: one bulk string, written without joining
+                parts.append(list(arg))
+            else:
+                parts.append(arg if isinstance(arg, bytes) else str(arg).encode())
+        
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await self._roundtrip(connection, parts)
+            except RedisError:
+                # An error reply is a complete reply: the connection is still in step
+                self._release(connection)
+                raise
+            except BaseException:
+                # The reply may still be on the wire, so the connection cannot be reused
+                connection[1].close()
+                raise
+            self._release(connection)
+            return reply
+    
+    def _release(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        if len(self._idle) < self.max_connections:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+    
+    async def _roundtrip(self, connection, parts: List[Any]) -> Any:
+        reader, writer = connection
+        out = [b"*%d\r\n" % len(parts)]
+        for part in parts:
+            chunks = part if isinstance(part, list) else [part]
+            out.append(b"$%d\r\n" % sum(len(chunk) for chunk in chunks))
+            out.extend(chunks)
+            out.append(b"\r\n")
+        writer.writelines(out)
+        await writer.drain()
+        return await self._read_reply(reader)
+    
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RedisError(body.decode(errors="replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            value = await reader.readexactly(length)
+            await reader.readexactly(2)
+            return value
+        if kind == b"*":
+            count = int(body)
+            if count < 0:
+                return None
+            return [await self._read_reply(reader) for _ in range(count)]
+        raise RedisError(f"Unexpected reply {line[:20]!r}")
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.command("GET", key)
+    
+    async def set(self, key: str, chunks: Sequence[bytes], ttl_seconds: float) -> None:
+        await self.command("SET", key, chunks, "PX", max(1, int(ttl_seconds * 1000)))
+    
+    async def delete(self, key: str) -> None:
+        await self.command("DEL", key)
+    
+    async def clear(self, prefix: str) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.command("SCAN", cursor, "MATCH", _glob_escape(prefix) + "*", "COUNT", 500)
+            if keys:
+                await self.command("DEL", *keys)
+            if cursor == b"0":
+                return
+    
+    async def close(self) -> None:
+        connections, self._idle = self._idle, []
+        for _, writer in connections:
+            writer.close()
+
+_store: Optional[CacheStore] = None
+
+def get_store() -> Optional[CacheStore]:
+    """The configured shared store, created on first use, or None without one"""
+    global _store
+    if _store is None and settings.CACHE_L2_BACKEND == "sqlite":
+        _store = SQLiteStore(
+            settings.CACHE_L2_SQLITE_PATH,
+            read_threads=settings.CACHE_L2_SQLITE_READ_THREADS,
+            # Writes run in the background with ten times the read timeout
+            busy_timeout_seconds=settings.CACHE_L2_TIMEOUT_SECONDS * 10
+        )
+    elif _store is None and settings.CACHE_L2_BACKEND == "redis":
+        _store = RedisStore(settings.CACHE_L2_REDIS_URL, settings.CACHE_L2_REDIS_MAX_CONNECTIONS)
+    return _store
+
+async def close_store() -> None:
+    global _store
+    store, _store = _store, None
+    if store is not None:
+        await store.close()
@@ -0,0 +1,276 @@
+from google.api_core import exceptions
+from google.cloud.retail_v2.types import Product
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import json
+import os
+import time
+import logging
+
+from config import settings
+from metrics import registry, CallbackGauge
+
+logger = logging.getLogger(__name__)
+
+class CatalogMirror:
+    """
+    In-memory mirror of the catalog branch.
+    
+    The mirror is bulk-loaded from a snapshot file and/or a full ListProducts
+    pass, then re-synced periodically. Each sync builds a new ID-keyed index
+    and swaps it in whole, so readers never see a half-built catalog.
+    """
+    
+    # First retry delay while nothing has loaded; doubles up to the sync interval
+    RETRY_SECONDS = 15.0
+    
+    def __init__(self, snapshot_path: Optional[str], sync_interval_seconds: float):
+        self.snapshot_path = snapshot_path
+        self.sync_interval_seconds = sync_interval_seconds
+        
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._order: List[str] = []
+        
+        self._source: Optional[Callable[[], AsyncIterator[Dict[str, Any]]]] = None
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+        
+        self.loaded_from: Optional[str] = None
+        self.last_sync_at: Optional[float] = None
+        self.last_sync_duration: Optional[float] = None
+        self.last_sync_error: Optional[str] = None
+        self.last_sync_changes: Dict[str, int] = {}
+        self.syncs = 0
+        self.sync_errors = 0
+    
+    @property
+    def ready(self) -> bool:
+        return self.loaded_from is not None
+    
+    async def start(self, source: Callable[[], AsyncIterator[Dict[str, Any]]]):
+        """Load the mirror and start periodic syncs"""
+        
+        self._source = source
+        
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            # Serve from the snapshot right away and catch up in the background
+            await self._load_snapshot()
+            self._sync_task = asyncio.create_task(self._sync_loop(sync_first=True))
+        else:
+            await self.sync()
+            self._sync_task = asyncio.create_task(self._sync_loop(sync_first=False))
+    
+    async def stop(self):
+        """Stop periodic syncs"""
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
+    
+    async def sync(self) -> Dict[str, Any]:
+        """Re-list the whole branch and swap in the new index"""
+        
+        async with self._sync_lock:
+            started = time.monotonic()
+            try:
+                products: Dict[str, Dict[str, Any]] = {}
+                order: List[str] = []
+                async for product in self._source():
+                    if product["id"] not in products:
+                        order.append(product["id"])
+                    products[product["id"]] = product
+                
+                self.last_sync_changes = self._diff(products)
+                self._products = products
+                self._order = order
+                
+                self.loaded_from = "sync"
+                self.last_sync_at = time.time()
+                self.last_sync_error = None
+                self.syncs += 1
+                
+                if self.snapshot_path:
+                    await asyncio.to_thread(self._write_snapshot, order, products)
+            
+            except Exception as e:
+                self.sync_errors += 1
+                self.last_sync_error = str(e)
+                logger.error("Catalog mirror sync error: %s", e)
+            
+            finally:
+                self.last_sync_duration = time.monotonic() - started
+            
+            return self.status()
+    
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Get a product by ID"""
+        return self._products.get(product_id)
+    
+    def list_products(
+        self,
+        page_size: int = 20,
+        page_token: str = "",
+        categories: Optional[List[str]] = None,
+        brands: Optional[List[str]] = None,
+        availability: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """List products in catalog order; page tokens are offsets into the filtered list"""
+        
+        offset = self._parse_page_token(page_token)
+        
+        matches = []
+        needed = offset + page_size + 1
+        for product_id in self._order:
+            product = self._products[product_id]
+            if self._matches(product, categories, brands, availability, min_price, max_price):
+                matches.append(product)
+                if len(matches) >= needed:
+                    break
+        
+        page = matches[offset:offset + page_size]
+        has_more = len(matches) > offset + page_size
+        
+        return {
+            "products": page,
+            "next_page_token": str(offset + page_size) if has_more else ""
+        }
+    
+    def status(self) -> Dict[str, Any]:
+        """Get sync state and lag metrics"""
+        return {
+            "enabled": settings.CATALOG_MIRROR_ENABLED,
+            "ready": self.ready,
+            "loaded_from": self.loaded_from,
+            "product_count": len(self._products),
+            "last_sync_at": (
+                datetime.fromtimestamp(self.last_sync_at, tz=timezone.utc).isoformat()
+                if self.last_sync_at else None
+            ),
+            "sync_lag_seconds": self.sync_lag(),
+            "last_sync_duration_seconds": (
+                round(self.last_sync_duration, 3) if self.last_sync_duration is not None else None
+            ),
+            "last_sync_error": self.last_sync_error,
+            "last_sync_changes": self.last_sync_changes,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "sync_interval_seconds": self.sync_interval_seconds
+        }
+    
+    def sync_lag(self) -> Optional[float]:
+        """Seconds since the data being served was listed, or None before the first load"""
+        return round(time.time() - self.last_sync_at, 3) if self.last_sync_at else None
+    
+    async def _sync_loop(self, sync_first: bool):
+        # A snapshot may be old, so catch up at once rather than after a full interval
+        if sync_first:
+            await self.sync()
+        
+        retry_seconds = self.RETRY_SECONDS
+        while True:
+            if self.ready:
+                delay, retry_seconds = self.sync_interval_seconds, self.RETRY_SECONDS
+            else:
+                # Nothing to serve yet: retry with backoff instead of waiting a full interval
+                delay, retry_seconds = min(retry_seconds, self.sync_interval_seconds), retry_seconds * 2
+            await asyncio.sleep(delay)
+            await self.sync()
+    
+    def _parse_page_token(self, page_token: str) -> int:
+        # Mirror tokens are offsets; a Retail API token from another listing is rejected
+        if not page_token:
+            return 0
+        if not page_token.isdigit():
+            raise exceptions.InvalidArgument(f"Invalid page token: {page_token!r}")
+        return int(page_token)
+    
+    def _matches(
+        self,
+        product: Dict[str, Any],
+        categories: Optional[List[str]],
+        brands: Optional[List[str]],
+        availability: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float]
+    ) -> bool:
+        if categories and not any(
+            c == wanted or c.startswith(wanted + " > ")
+            for c in product["categories"] for wanted in categories
+        ):
+            return False
+        
+        if brands and not set(brands) & set(product["brands"]):
+            return False
+        
+        if availability and self._availability_name(product["availability"]) != availability.upper():
+            return False
+        
+        if min_price is not None or max_price is not None:
+            price = product["price_info"]["price"] if product.get("price_info") else None
+            if price is None:
+                return False
+            if min_price is not None and price < min_price:
+                return False
+            if max_price is not None and price > max_price:
+                return False
+        
+        return True
+    
+    def _availability_name(self, value: Any) -> str:
+        if isinstance(value, int):
+            return Product.Availability(value).name
+        return str(value)
+    
+    def _diff(self, products: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Count added, removed and changed products against the current index"""
+        added = sum(1 for product_id in products if product_id not in self._products)
+        removed = sum(1 for product_id in self._products if product_id not in products)
+        changed = sum(
+            1 for product_id, product in products.items()
+            if product_id in self._products and self._products[product_id] != product
+        )
+        return {"added": added, "removed": removed, "changed": changed}
+    
+    async def _load_snapshot(self):
+        started = time.monotonic()
+        order, products = await asyncio.to_thread(self._read_snapshot)
+        
+        self._products = products
+        self._order = order
+        self.loaded_from = "snapshot"
+        self.last_sync_at = os.path.getmtime(self.snapshot_path)
+        self.last_sync_duration = time.monotonic() - started
+        logger.info("Catalog mirror loaded %d products from %s", len(products), self.snapshot_path)
+    
+    def _read_snapshot(self):
+        products: Dict[str, Dict[str, Any]] = {}
+        order: List[str] = []
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    product = json.loads(line)
+                    if product["id"] not in products:
+                        order.append(product["id"])
+                    products[product["id"]] = product
+        return order, products
+    
+    def _write_snapshot(self, order: List[str], products: Dict[str, Dict[str, Any]]):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for product_id in order:
+                f.write(json.dumps(products[product_id]))
+                f.write("\n")
+        os.replace(tmp_path, self.snapshot_path)
+
+# Singleton instance
+catalog_mirror = CatalogMirror(
+    snapshot_path=settings.CATALOG_MIRROR_SNAPSHOT_PATH,
+    sync_interval_seconds=settings.CATALOG_MIRROR_SYNC_INTERVAL_SECONDS
+)
+registry.add(CallbackGauge(
+    "catalog_mirror_sync_lag_seconds",
+    "Seconds since the catalog mirror's data was listed from the Retail API",
+    read=lambda: catalog_mirror.sync_lag() if settings.CATALOG_MIRROR_ENABLED else None
+))
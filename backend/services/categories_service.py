@@ -1,29 +1,116 @@
-from google.cloud.retail_v2 import SearchServiceClient
+from google.api_core import exceptions
+from google.cloud.retail_v2 import SearchServiceAsyncClient
 from google.cloud.retail_v2.types import SearchRequest
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+import asyncio
 import uuid
+import logging
 
 from config import settings
+from services.resilience import retail_upstream
+from services.retail_clients import retail_clients
+from services.cache import TieredCache
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_SEPARATOR = " > "
+
+_CACHE_KEY = "all"
 
 class CategoriesService:
     def __init__(self):
-        self.search_client = SearchServiceClient()
-        # Simple in-memory cache
-        self._cache = None
-        self._cache_timestamp = None
-        self._cache_duration = timedelta(hours=1)  # Cache for 1 hour
+        # Categories and their tree. The entry goes stale once it is within the
+        # refresh-ahead window of its TTL, and the last good value keeps being
+        # served for CATEGORIES_MAX_STALE_SECONDS while refreshes fail
+        fresh_seconds = settings.CATEGORIES_CACHE_TTL_SECONDS - settings.CATEGORIES_REFRESH_AHEAD_SECONDS
+        self._cache = TieredCache(
+            "categories",
+            max_entries=1,
+            ttl_seconds=max(0.0, fresh_seconds),
+            stale_seconds=settings.CATEGORIES_REFRESH_AHEAD_SECONDS + settings.CATEGORIES_MAX_STALE_SECONDS
+        )
+        # Concurrent callers share one fetch
+        self._flight = SingleFlight("categories")
+    
+    @property
+    def search_client(self) -> SearchServiceAsyncClient:
+        return retail_clients.search()
     
     async def get_categories(self) -> List[Dict[str, Any]]:
-        """Get all unique categories from the catalog with caching"""
+        """
+        Get all unique categories from the catalog with caching.
+        
+        Raises ServiceUnavailable if nothing is cached and the fetch fails.
+        """
+        entry = await self._current()
+        return entry["categories"]
+    
+    async def get_category_tree(self, path: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the category hierarchy built from "A > B > C" category names.
+        
+        With a path, returns the children of that node, or None if it does not exist.
+        Raises ServiceUnavailable if nothing is cached and the fetch fails.
+        """
+        entry = await self._current()
         
-        # Check if cache is valid
-        if self._cache and self._cache_timestamp:
-            if datetime.now() - self._cache_timestamp < self._cache_duration:
-                print("Returning cached categories")
-                return self._cache
+        nodes = entry["tree"]
+        if not path:
+            return nodes
         
-        print("Fetching categories from Retail API")
+        for name in path.split(CATEGORY_SEPARATOR.strip()):
+            node = next((n for n in nodes if n["name"] == name.strip()), None)
+            if node is None:
+                return None
+            nodes = node["children"]
+        return nodes
+    
+    def warm(self):
+        """Start fetching categories in the background"""
+        self._start_refresh()
+    
+    async def _current(self) -> Dict[str, Any]:
+        found = await self._cache.lookup(_CACHE_KEY)
+        if found is None:
+            # Nothing cached yet: wait for the shared fetch. An empty answer here
+            # would be cached downstream as if the catalog had no categories
+            entry = await self._flight.do("categories", self._refresh)
+            if entry is None:
+                raise exceptions.ServiceUnavailable("Categories are unavailable")
+            return entry
+        
+        entry, stale = found
+        if stale:
+            # Close to or past expiry: refresh in the background and keep serving
+            # the last good value until it lands
+            self._start_refresh()
+        else:
+            logger.debug("Returning cached categories")
+        return entry
+    
+    def _start_refresh(self) -> asyncio.Future:
+        return self._flight.start("categories", self._refresh)
+    
+    async def _refresh(self) -> Optional[Dict[str, Any]]:
+        # Another worker may already have refreshed the shared entry
+        shared = await self._cache.lookup_shared(_CACHE_KEY)
+        if shared is not None and not shared[1]:
+            return shared[0]
+        
+        try:
+            categories = await self._fetch_categories()
+            entry = {"categories": categories, "tree": self._build_tree(categories)}
+            self._cache.set(_CACHE_KEY, entry)
+            return entry
+        
+        except Exception as e:
+            # Keep serving the last good value
+            logger.error("Categories fetch error: %s", e)
+            return None
+    
+    async def _fetch_categories(self) -> List[Dict[str, Any]]:
+        logger.debug("Fetching categories from Retail API")
         
         placement = settings.get_placement_path(settings.RETAIL_SEARCH_PLACEMENT)
         
@@ -33,7 +120,7 @@ class CategoriesService:
                 "facet_key": {
                     "key": "categories"
                 },
-                "limit": 100  # Get up to 100 categories
+                "limit": settings.CATEGORIES_FACET_LIMIT
             }
         ]
         
@@ -46,42 +133,79 @@ class CategoriesService:
             facet_specs=facet_specs
         )
         
-        try:
-            response = self.search_client.search(request)
-            
-            categories = []
-            
-            # Extract categories from facets
-            for facet in response.facets:
-                if facet.key == "categories":
-                    for value in facet.values:
-                        # Create slug from category name
-                        slug = value.value.lower().replace(' & ', '-').replace(' ', '-').replace('&', 'and')
-                        
-                        categories.append({
-                            "name": value.value,
-                            "slug": slug,
-                            "count": value.count
-                        })
-            
-            # Sort by count (most popular first)
-            categories.sort(key=lambda x: x['count'], reverse=True)
-            
-            # Update cache
-            self._cache = categories
-            self._cache_timestamp = datetime.now()
-            
-            return categories
+        response = await retail_upstream.call(
+            "search",
+            settings.RETAIL_SEARCH_PLACEMENT,
+            lambda timeout: self.search_client.search(request, timeout=timeout)
+        )
         
-        except Exception as e:
-            print(f"Categories fetch error: {e}")
-            # Return empty list on error
-            return []
+        categories = self._extract_categories(response.facets)
+        
+        if len(categories) >= settings.CATEGORIES_FACET_LIMIT:
+            logger.warning("Category facet hit its limit of %d values; raise CATEGORIES_FACET_LIMIT", settings.CATEGORIES_FACET_LIMIT)
+        
+        return categories
+    
+    def _extract_categories(self, facets) -> List[Dict[str, Any]]:
+        """Slugged categories from the "categories" facet, most popular first"""
+        categories = []
+        for facet in facets:
+            if facet.key == "categories":
+                for value in facet.values:
+                    categories.append({
+                        "name": value.value,
+                        "slug": self._slugify(value.value),
+                        "count": value.count
+                    })
+        
+        categories.sort(key=lambda x: x['count'], reverse=True)
+        return categories
+    
+    def _build_tree(self, categories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Build the category forest from "A > B > C" names.
+        
+        "count" is the facet count of the node itself (0 for levels that only appear
+        as ancestors); "total_count" rolls up the node and all its descendants.
+        """
+        roots: Dict[str, Dict[str, Any]] = {}
+        
+        for category in categories:
+            names = [name.strip() for name in category["name"].split(CATEGORY_SEPARATOR.strip())]
+            level = roots
+            node = None
+            for depth, name in enumerate(names):
+                if name not in level:
+                    path = CATEGORY_SEPARATOR.join(names[:depth + 1])
+                    level[name] = {
+                        "name": name,
+                        "path": path,
+                        "slug": "/".join(self._slugify(part) for part in names[:depth + 1]),
+                        "count": 0,
+                        "total_count": 0,
+                        "children": {}
+                    }
+                node = level[name]
+                level = node["children"]
+            node["count"] += category["count"]
+        
+        def finalize(level: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            nodes = list(level.values())
+            for node in nodes:
+                node["children"] = finalize(node["children"])
+                node["total_count"] = node["count"] + sum(child["total_count"] for child in node["children"])
+            nodes.sort(key=lambda x: x["total_count"], reverse=True)
+            return nodes
+        
+        return finalize(roots)
+    
+    def _slugify(self, name: str) -> str:
+        """Create slug from category name"""
+        return name.lower().replace(' & ', '-').replace(' ', '-').replace('&', 'and')
     
     def clear_cache(self):
         """Clear the categories cache"""
-        self._cache = None
-        self._cache_timestamp = None
+        self._cache.clear()
 
 # Singleton instance
 categories_service = CategoriesService()
@@ -0,0 +1,94 @@
+from google.api_core.exceptions import NotFound
+from google.cloud.retail_v2.types import Product
+from typing import Any, Awaitable, Callable, Dict
+
+from config import settings
+from metrics import registry
+from services.cache import TieredCache
+from services.singleflight import SingleFlight
+
+class _Missing:
+    """Negative cache marker for products the Retail API reported as NOT_FOUND"""
+    
+    def __init__(self, message: str):
+        self.message = message
+
+class ProductCodec:
+    """Serializes Product messages (protobuf wire format) and NOT_FOUND markers for the shared cache"""
+    
+    def dumps(self, value: Any) -> bytes:
+        if isinstance(value, _Missing):
+            return b"M" + value.message.encode("utf-8")
+        return b"P" + Product.serialize(value)
+    
+    def loads(self, data: memoryview) -> Any:
+        if data[:1] == b"M":
+            return _Missing(str(data[1:], "utf-8"))
+        return Product.wrap(Product.pb().FromString(data[1:]))
+
+class ProductCache:
+    """
+    Shared product-detail cache used by product lookup and search hydration.
+    
+    Entries are bounded in count and expire after a TTL. NOT_FOUND responses are
+    cached for a shorter TTL, and concurrent lookups for the same product share a
+    single upstream call.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self._cache = TieredCache("product", max_entries=max_entries, ttl_seconds=ttl_seconds, codec=ProductCodec())
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._flight = SingleFlight("product")
+        
+        self.negative_hits = 0
+    
+    async def get(self, product_id: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        """Get a product, calling loader(product_id) on a cache miss"""
+        
+        cached = await self._cache.get(product_id)
+        if isinstance(cached, _Missing):
+            self.negative_hits += 1
+            raise NotFound(cached.message)
+        if cached is not None:
+            return cached
+        
+        return await self._flight.do(product_id, lambda: self._load(product_id, loader))
+    
+    async def _load(self, product_id: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        try:
+            product = await loader(product_id)
+        except NotFound as e:
+            self._cache.set(product_id, _Missing(e.message), ttl_seconds=self.negative_ttl_seconds)
+            raise
+        
+        self._cache.set(product_id, product)
+        return product
+    
+    def contains(self, product_id: str) -> bool:
+        """Whether a product (or its NOT_FOUND) is cached and fresh"""
+        return self._cache.contains(product_id)
+    
+    async def invalidate(self, product_id: str) -> bool:
+        """Drop a product from the cache; returns True if it was cached"""
+        return await self._cache.invalidate(product_id)
+    
+    def clear(self):
+        """Drop all cached products"""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        stats = self._cache.stats()
+        stats["negative_hits"] = self.negative_hits
+        flight = self._flight.stats()
+        stats["coalesced"] = flight["coalesced"]
+        stats["in_flight"] = flight["in_flight"]
+        return stats
+
+# Singleton instance
+product_cache = ProductCache(
+    max_entries=settings.PRODUCT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.PRODUCT_CACHE_NEGATIVE_TTL_SECONDS
+)
+registry.register_cache("product", product_cache.stats)
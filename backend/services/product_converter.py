@@ -0,0 +1,101 @@
+from google.cloud.retail_v2.types import Product
+from google.protobuf import json_format
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+# Fields of the product dict returned by every endpoint, in output order
+PRODUCT_FIELDS = (
+    "id",
+    "name",
+    "title",
+    "description",
+    "categories",
+    "brands",
+    "price_info",
+    "availability",
+    "uri",
+    "images",
+    "attributes"
+)
+
+_AVAILABILITY_NAMES = {availability.value: availability.name for availability in Product.Availability}
+
+def _product_id(pb) -> str:
+    # Search results can carry only the resource name
+    if pb.id:
+        return pb.id
+    return pb.name.rsplit('/', 1)[-1] if pb.name else ''
+
+def _price_info(pb) -> Optional[Dict[str, Any]]:
+    if not pb.HasField("price_info"):
+        return None
+    pi = pb.price_info
+    return {
+        "currency_code": pi.currency_code or 'USD',
+        "price": pi.price,
+        "original_price": pi.original_price or None,
+        "cost": pi.cost or None
+    }
+
+def _images(pb) -> List[Dict[str, Any]]:
+    return [{"uri": img.uri, "height": img.height, "width": img.width} for img in pb.images]
+
+def _attributes(pb) -> Dict[str, Any]:
+    attributes = {}
+    for key, value in pb.attributes.items():
+        if value.text:
+            attributes[key] = list(value.text)
+        elif value.numbers:
+            attributes[key] = list(value.numbers)
+    return attributes
+
+_EXTRACTORS: Dict[str, Callable[[Any], Any]] = {
+    "id": _product_id,
+    "name": lambda pb: pb.name,
+    "title": lambda pb: pb.title,
+    "description": lambda pb: pb.description,
+    "categories": lambda pb: list(pb.categories),
+    "brands": lambda pb: list(pb.brands),
+    "price_info": _price_info,
+    "availability": lambda pb: _AVAILABILITY_NAMES.get(pb.availability, 'UNKNOWN'),
+    "uri": lambda pb: pb.uri,
+    "images": _images,
+    "attributes": _attributes
+}
+
+def parse_fields(fields: Union[str, Iterable[str], None]) -> Optional[List[str]]:
+    """
+    Normalize a field projection from a comma-separated string or a list.
+    
+    Unknown names are dropped and "id" is always kept. Returns None (all fields)
+    when nothing was requested.
+    """
+    if not fields:
+        return None
+    
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    
+    requested = {field.strip() for field in fields}
+    return [field for field in PRODUCT_FIELDS if field in requested or field == "id"]
+
+def product_to_dict(product, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Convert a Product message to the API product dict.
+    
+    Reads the underlying protobuf message directly instead of going through the
+    proto-plus wrapper. Pass fields (from parse_fields) to build only those keys.
+    """
+    pb = Product.pb(product) if isinstance(product, Product) else product
+    return {field: _EXTRACTORS[field](pb) for field in (fields or PRODUCT_FIELDS)}
+
+def product_from_value(value):
+    """Parse the product a PredictResponse carries in its result metadata (a protobuf Value)"""
+    product = Product.pb(Product())
+    json_format.ParseDict(json_format.MessageToDict(value), product, ignore_unknown_fields=True)
+    return product
+
+def project_product_dict(product: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Apply a field projection to an already converted product dict"""
+    if not fields:
+        return product
+    return {field: product.get(field) for field in fields}
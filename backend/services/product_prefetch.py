@@ -0,0 +1,106 @@
+from typing import Any, Dict, List
+import asyncio
+import logging
+
+from config import settings
+from metrics import registry, http_requests_in_flight, upstream_in_flight, Counter
+from services.catalog_mirror import catalog_mirror
+from services.product_cache import product_cache
+from services.products_service import products_service
+
+logger = logging.getLogger(__name__)
+
+prefetch_outcomes = registry.add(Counter(
+    "product_prefetch_total",
+    "Speculative product-detail fetches by outcome",
+    labels=("outcome",)
+))
+
+class ProductPrefetcher:
+    """
+    Speculative product-detail fetches for the top results of a page.
+    
+    After a search or recommendation response is sent, the first
+    PRODUCT_PREFETCH_TOP_K product IDs that are not already cached are loaded
+    into the product cache in the background, so a click through to the
+    product page is served from cache. At most PRODUCT_PREFETCH_CONCURRENCY
+    fetches run at once across all requests and at most
+    PRODUCT_PREFETCH_MAX_PENDING wait. Prefetches are dropped, never delayed,
+    while the server is busy.
+    """
+    
+    def __init__(self):
+        self._semaphore = asyncio.Semaphore(settings.PRODUCT_PREFETCH_CONCURRENCY)
+        self._pending: Dict[str, asyncio.Future] = {}
+        
+        self.scheduled = 0
+        self.fetched = 0
+        self.skipped_cached = 0
+        self.dropped_busy = 0
+        self.dropped_full = 0
+        self.errors = 0
+    
+    async def prefetch(self, results: List[Dict[str, Any]]) -> None:
+        """Schedule detail fetches for the top results (dicts with an "id"); returns at once"""
+        if not settings.PRODUCT_PREFETCH_ENABLED:
+            return
+        if settings.CATALOG_MIRROR_ENABLED and catalog_mirror.ready:
+            return  # Product lookups are already served from memory
+        
+        product_ids = [result["id"] for result in results[:settings.PRODUCT_PREFETCH_TOP_K] if result.get("id")]
+        if self._busy():
+            self._count("dropped_busy", len(product_ids))
+            return
+        
+        for product_id in product_ids:
+            if product_id in self._pending or product_cache.contains(product_id):
+                self._count("skipped_cached")
+                continue
+            if len(self._pending) >= settings.PRODUCT_PREFETCH_MAX_PENDING:
+                self._count("dropped_full")
+                continue
+            
+            self._count("scheduled")
+            self._pending[product_id] = asyncio.ensure_future(self._fetch(product_id))
+    
+    async def _fetch(self, product_id: str) -> None:
+        try:
+            async with self._semaphore:
+                # Load may have picked up while this waited for a slot
+                if self._busy():
+                    self._count("dropped_busy")
+                    return
+                await products_service.get_product_message(product_id)
+                self._count("fetched")
+        except Exception as e:
+            # Not found or failed: the product page will report it if the user gets there
+            self._count("errors")
+            logger.debug("Product prefetch error: %s", e, extra={"fields": {"product_id": product_id}})
+        finally:
+            self._pending.pop(product_id, None)
+    
+    def _busy(self) -> bool:
+        return (
+            http_requests_in_flight.total() > settings.PRODUCT_PREFETCH_MAX_HTTP_IN_FLIGHT
+            or upstream_in_flight.total() > settings.PRODUCT_PREFETCH_MAX_UPSTREAM_IN_FLIGHT
+        )
+    
+    def _count(self, outcome: str, amount: int = 1):
+        setattr(self, outcome, getattr(self, outcome) + amount)
+        prefetch_outcomes.inc(outcome, amount=amount)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get prefetch counters"""
+        return {
+            "enabled": settings.PRODUCT_PREFETCH_ENABLED,
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "fetched": self.fetched,
+            "skipped_cached": self.skipped_cached,
+            "dropped_busy": self.dropped_busy,
+            "dropped_full": self.dropped_full,
+            "errors": self.errors
+        }
+
+# Singleton instance
+product_prefetcher = ProductPrefetcher()
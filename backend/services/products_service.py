@@ -1,35 +1,106 @@
-from google.cloud.retail_v2 import ProductServiceClient
-from google.cloud.retail_v2.types import GetProductRequest, ListProductsRequest
-from typing import Dict, Any
+from google.api_core import exceptions
+from google.cloud.retail_v2 import ProductServiceAsyncClient
+from google.cloud.retail_v2.types import GetProductRequest, ListProductsRequest, Product
+from typing import Dict, Any, AsyncIterator, List, Optional
+import json
+import logging
 
 from config import settings
+from services.resilience import retail_upstream
+from services.retail_clients import retail_clients
+from services.product_cache import product_cache
+from services.catalog_mirror import catalog_mirror
+from services.product_converter import product_to_dict, project_product_dict
+from services.singleflight import SingleFlight, request_key
+
+logger = logging.getLogger(__name__)
 
 class ProductsService:
     def __init__(self):
-        self.product_client = ProductServiceClient()
+        # Identical listings in flight at the same time share one RPC
+        self._list_flight = SingleFlight("list_products")
+    
+    @property
+    def product_client(self) -> ProductServiceAsyncClient:
+        return retail_clients.product()
     
-    async def get_product(self, product_id: str) -> Dict[str, Any]:
+    async def get_product(self, product_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """Get a single product by ID"""
         
-        name = f"{settings.branch_path}/products/{product_id}"
-        
-        request = GetProductRequest(name=name)
+        if settings.CATALOG_MIRROR_ENABLED and catalog_mirror.ready:
+            product = catalog_mirror.get(product_id)
+            if product is not None:
+                return project_product_dict(product, fields)
         
         try:
-            product = self.product_client.get_product(request)
-            return self._convert_product_to_dict(product)
+            product = await self.get_product_message(product_id)
+            return product_to_dict(product, fields)
         
         except Exception as e:
-            print(f"Get product error: {e}")
+            logger.warning("Get product error: %s", e, extra={"fields": {"product_id": product_id}})
             raise
     
+    async def get_product_message(self, product_id: str) -> Product:
+        """Get a single Product message by ID through the shared product cache"""
+        return await product_cache.get(product_id, self._fetch_product)
+    
+    async def _fetch_product(self, product_id: str) -> Product:
+        """Fetch a single Product message from the Retail API"""
+        
+        name = f"{settings.branch_path}/products/{product_id}"
+        
+        request = GetProductRequest(name=name)
+        
+        return await retail_upstream.call(
+            "get_product",
+            settings.RETAIL_BRANCH_ID,
+            lambda timeout: self.product_client.get_product(request, timeout=timeout),
+            hedge=True
+        )
+    
     async def list_products(
         self,
         page_size: int = 20,
         page_token: str = "",
-        filter: str = ""
+        filter: str = "",
+        categories: Optional[List[str]] = None,
+        brands: Optional[List[str]] = None,
+        availability: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """List products with optional filtering"""
+        """
+        List products with optional filtering.
+        
+        When the catalog mirror is ready, listing is served from memory and the
+        categories/brands/availability/price filters apply. A Retail filter
+        expression always goes to the Retail API. The mirror-only filters raise
+        InvalidArgument when the mirror is off or a filter expression is given,
+        and ServiceUnavailable while the mirror is still loading.
+        """
+        
+        mirror_filters = bool(categories or brands or availability) or min_price is not None or max_price is not None
+        if mirror_filters and (not settings.CATALOG_MIRROR_ENABLED or filter):
+            raise exceptions.InvalidArgument(
+                "categories, brands, availability, min_price and max_price need the catalog mirror "
+                "and cannot be combined with a filter expression"
+            )
+        if mirror_filters and not catalog_mirror.ready:
+            raise exceptions.ServiceUnavailable("Catalog mirror is still loading")
+        
+        if settings.CATALOG_MIRROR_ENABLED and catalog_mirror.ready and not filter:
+            results = catalog_mirror.list_products(
+                page_size=page_size,
+                page_token=page_token,
+                categories=categories,
+                brands=brands,
+                availability=availability,
+                min_price=min_price,
+                max_price=max_price
+            )
+            results["products"] = [project_product_dict(product, fields) for product in results["products"]]
+            return results
         
         parent = settings.branch_path
         
@@ -40,76 +111,69 @@ class ProductsService:
             filter=filter
         )
         
-        try:
-            response = self.product_client.list_products(request)
+        async def fetch() -> Dict[str, Any]:
+            pager = await retail_upstream.call(
+                "list_products",
+                settings.RETAIL_BRANCH_ID,
+                lambda timeout: self.product_client.list_products(request, timeout=timeout)
+            )
             
-            products = []
-            for product in response:
-                products.append(self._convert_product_to_dict(product))
+            # Only the first page: iterating the pager would walk every later page
+            products = [product_to_dict(product, fields) for product in pager.products]
             
             return {
                 "products": products,
-                "next_page_token": response.next_page_token if hasattr(response, 'next_page_token') else ""
+                "next_page_token": pager.next_page_token
             }
         
+        try:
+            key = request_key(page_size=page_size, page_token=page_token, filter=filter, fields=fields)
+            return await self._list_flight.do(key, fetch)
+        
         except Exception as e:
-            print(f"List products error: {e}")
+            logger.error("List products error: %s", e)
             raise
     
-    def _convert_product_to_dict(self, product) -> Dict[str, Any]:
-        """Convert Product protobuf to dict"""
-        # Extract price info (API uses priceInfo, not price_info)
-        price_info = None
-        if hasattr(product, 'priceInfo') and product.priceInfo:
-            pi = product.priceInfo
-            price_info = {
-                "currency_code": pi.currencyCode if hasattr(pi, 'currencyCode') else 'USD',
-                "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
-                "original_price": float(pi.originalPrice) if hasattr(pi, 'originalPrice') else None,
-                "cost": float(pi.cost) if hasattr(pi, 'cost') else None
-            }
-        elif hasattr(product, 'price_info') and product.price_info:
-            # Fallback for snake_case
-            pi = product.price_info
-            price_info = {
-                "currency_code": pi.currency_code if hasattr(pi, 'currency_code') else 'USD',
-                "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
-                "original_price": float(pi.original_price) if hasattr(pi, 'original_price') else None,
-                "cost": float(pi.cost) if hasattr(pi, 'cost') else None
-            }
-        
-        # Extract images
-        images = []
-        if hasattr(product, 'images') and product.images:
-            for img in product.images:
-                images.append({
-                    "uri": img.uri if hasattr(img, 'uri') else '',
-                    "height": img.height if hasattr(img, 'height') else 0,
-                    "width": img.width if hasattr(img, 'width') else 0
-                })
-        
-        # Extract attributes
-        attributes = {}
-        if hasattr(product, 'attributes') and product.attributes:
-            for key, value in product.attributes.items():
-                if hasattr(value, 'text') and value.text:
-                    attributes[key] = list(value.text)
-                elif hasattr(value, 'numbers') and value.numbers:
-                    attributes[key] = list(value.numbers)
+    async def iter_product_pages(
+        self,
+        filter: str = "",
+        page_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Walk the branch one ListProducts page at a time"""
         
-        return {
-            "id": product.id if hasattr(product, 'id') else '',
-            "name": product.name if hasattr(product, 'name') else '',
-            "title": product.title if hasattr(product, 'title') else 'Untitled Product',
-            "description": product.description if hasattr(product, 'description') else '',
-            "categories": list(product.categories) if hasattr(product, 'categories') else [],
-            "brands": list(product.brands) if hasattr(product, 'brands') else [],
-            "price_info": price_info,
-            "availability": product.availability if hasattr(product, 'availability') else 'UNKNOWN',
-            "uri": product.uri if hasattr(product, 'uri') else '',
-            "images": images,
-            "attributes": attributes
-        }
+        page_token = ""
+        while True:
+            request = ListProductsRequest(
+                parent=settings.branch_path,
+                page_size=page_size,
+                page_token=page_token,
+                filter=filter
+            )
+            
+            # One call per page, so each page gets its own deadline, breaker check
+            # and metrics (the pager's own iteration would bypass retail_upstream)
+            pager = await retail_upstream.call(
+                "list_products",
+                settings.RETAIL_BRANCH_ID,
+                lambda timeout: self.product_client.list_products(request, timeout=timeout)
+            )
+            yield [product_to_dict(product) for product in pager.products]
+            
+            page_token = pager.next_page_token
+            if not page_token:
+                return
+    
+    async def iter_product_dicts(self, page_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Walk every product in the branch, page by page"""
+        async for page in self.iter_product_pages(page_size=page_size):
+            for product in page:
+                yield product
+    
+    async def export_products_ndjson(self, filter: str = "", page_size: int = 1000) -> AsyncIterator[bytes]:
+        """Stream the catalog as NDJSON, holding at most one page in memory"""
+        async for page in self.iter_product_pages(filter=filter, page_size=page_size):
+            if page:
+                yield "".join(json.dumps(product) + "\n" for product in page).encode("utf-8")
 
 # Singleton instance
 products_service = ProductsService()
@@ -0,0 +1,72 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+
+from config import settings
+from metrics import registry
+from services.cache import TieredCache
+
+class RecommendationsCache:
+    """
+    Cache for recommendations from non-personalized models.
+    
+    Models like similar_items only look at the product being viewed, so their
+    results are keyed on the request without the visitor or page size. Entries
+    hold full product dicts and the page size they were fetched with; a request
+    for fewer results is served by slicing, and field projections are applied
+    when they are served.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = TieredCache("recommendations", max_entries=max_entries, ttl_seconds=ttl_seconds)
+    
+    def make_key(
+        self,
+        model: str,
+        product_id: str,
+        filter: str,
+        params: Optional[Dict[str, Any]]
+    ) -> str:
+        """Build the cache key for a recommendations request (shared by all page sizes)"""
+        canonical = {
+            "model": model,
+            "product_id": product_id,
+            "filter": filter.strip(),
+            "params": params or {}
+        }
+        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str, page_size: int) -> Optional[Dict[str, Any]]:
+        """Get a cached response with at most page_size results, or None if the entry is too small"""
+        entry = await self._cache.get(key)
+        if entry is None:
+            return None
+        
+        response = entry["response"]
+        # A short entry already holds every result the model has
+        complete = len(response["results"]) < entry["page_size"]
+        if entry["page_size"] < page_size and not complete:
+            return None
+        if len(response["results"]) <= page_size:
+            return response
+        return {**response, "results": response["results"][:page_size]}
+    
+    def set(self, key: str, page_size: int, response: Dict[str, Any]) -> None:
+        """Store a response fetched with page_size"""
+        self._cache.set(key, {"page_size": page_size, "response": response})
+    
+    def clear(self):
+        """Drop all cached responses"""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        return self._cache.stats()
+
+# Singleton instance
+recommendations_cache = RecommendationsCache(
+    max_entries=settings.RECOMMENDATIONS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RECOMMENDATIONS_CACHE_TTL_SECONDS
+)
+registry.register_cache("recommendations", recommendations_cache.stats)
@@ -1,13 +1,31 @@
-from google.cloud.retail_v2 import PredictionServiceClient
-from google.cloud.retail_v2.types import PredictRequest, UserEvent, ProductDetail, Product
-from typing import Dict, Any, List
+from google.cloud.retail_v2 import PredictionServiceAsyncClient
+from google.cloud.retail_v2.types import PredictRequest, PredictResponse, UserEvent, ProductDetail, Product
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import time
 import uuid
+import logging
 
 from config import settings
+from services.resilience import retail_upstream
+from services.retail_clients import retail_clients
+from services.product_converter import product_to_dict, product_from_value, project_product_dict
+from services.recommendations_cache import recommendations_cache
+
+logger = logging.getLogger(__name__)
 
 class RecommendationsService:
     def __init__(self):
-        self.prediction_client = PredictionServiceClient()
+        self._warm_task: Optional[asyncio.Task] = None
+        self.last_warm_at: Optional[float] = None
+        self.last_warm_duration: Optional[float] = None
+        self.warmed = 0
+        self.warm_errors = 0
+    
+    @property
+    def prediction_client(self) -> PredictionServiceAsyncClient:
+        return retail_clients.prediction()
     
     async def get_recommendations(
         self,
@@ -16,10 +34,50 @@ class RecommendationsService:
         product_id: str = None,
         page_size: int = 10,
         filter: str = "",
-        params: Dict[str, Any] = None
+        params: Dict[str, Any] = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Get product recommendations"""
         
+        # Non-personalized models only depend on the product, so their results are shared
+        cache_key = None
+        if settings.RECOMMENDATIONS_CACHE_ENABLED and product_id and not self._is_personalized(model):
+            cache_key = recommendations_cache.make_key(model, product_id, filter, params)
+            cached = await recommendations_cache.get(cache_key, page_size)
+            if cached is not None:
+                return self._project(cached, fields)
+        
+        try:
+            if cache_key is None:
+                return await self._predict(model, visitor_id, product_id, page_size, filter, params, fields)
+            
+            response = await self._predict(model, visitor_id, product_id, page_size, filter, params)
+            recommendations_cache.set(cache_key, page_size, response)
+            return self._project(response, fields)
+        
+        except Exception as e:
+            logger.error("Recommendations error for model %s: %s", model, e)
+            # Return empty results instead of failing
+            return {
+                "results": [],
+                "attribution_token": "",
+                "missing_ids": [],
+                "validate_only": False,
+                "error": str(e)
+            }
+    
+    async def _predict(
+        self,
+        model: str,
+        visitor_id: Optional[str],
+        product_id: Optional[str],
+        page_size: int,
+        filter: str,
+        params: Optional[Dict[str, Any]],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Call the prediction API and convert the response"""
+        
         # Map model name to serving config
         serving_config = self._get_serving_config(model)
         placement = settings.get_placement_path(serving_config)
@@ -54,37 +112,154 @@ class RecommendationsService:
             user_event=user_event,
             page_size=page_size,
             filter=filter,
-            params=params or {}
+            # Ask for product data in the result metadata unless the caller decides otherwise
+            params={"returnProduct": True, **(params or {})}
         )
         
-        try:
-            response = self.prediction_client.predict(request)
-            
-            # Convert response to dict
-            results = []
-            for result in response.results:
+        response = await retail_upstream.call(
+            "predict",
+            serving_config,
+            lambda timeout: self.prediction_client.predict(request, timeout=timeout)
+        )
+        
+        # Convert response to dict
+        results = []
+        for result in PredictResponse.pb(response).results:
+            product = result.metadata["product"] if "product" in result.metadata else None
+            results.append({
+                "id": result.id,
+                "product": (
+                    product_to_dict(product_from_value(product), fields)
+                    if product is not None else {"id": result.id}
+                )
+            })
+        
+        return {
+            "results": results,
+            "attribution_token": response.attribution_token,
+            "missing_ids": list(response.missing_ids),
+            "validate_only": response.validate_only
+        }
+    
+    def _project(self, response: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        """Apply a field projection to the products of a cached response"""
+        if not fields:
+            return response
+        return {
+            **response,
+            "results": [
+                {"id": result["id"], "product": project_product_dict(result["product"], fields)}
+                for result in response["results"]
+            ]
+        }
+    
+    async def warm_cache(self) -> Dict[str, Any]:
+        """Precompute non-personalized recommendations for RECOMMENDATIONS_WARM_PRODUCT_IDS"""
+        
+        started = time.monotonic()
+        models = [model["id"] for model in self.get_available_models() if not model["personalized"]]
+        semaphore = asyncio.Semaphore(settings.RECOMMENDATIONS_WARM_CONCURRENCY)
+        page_size = settings.RECOMMENDATIONS_WARM_PAGE_SIZE
+        
+        async def warm(model: str, product_id: str) -> bool:
+            async with semaphore:
+                try:
+                    response = await self._predict(model, None, product_id, page_size, "", None)
+                except Exception as e:
+                    logger.warning("Recommendations warm error for %s/%s: %s", model, product_id, e)
+                    return False
+                recommendations_cache.set(recommendations_cache.make_key(model, product_id, "", None), page_size, response)
+                return True
+        
+        outcomes = await asyncio.gather(*(
+            warm(model, product_id)
+            for product_id in settings.RECOMMENDATIONS_WARM_PRODUCT_IDS
+            for model in models
+        ))
+        
+        self.warmed += sum(outcomes)
+        self.warm_errors += len(outcomes) - sum(outcomes)
+        self.last_warm_at = time.time()
+        self.last_warm_duration = time.monotonic() - started
+        logger.info("Warmed recommendations", extra={"fields": {
+            "warmed": sum(outcomes),
+            "failed": len(outcomes) - sum(outcomes),
+            "duration_seconds": round(self.last_warm_duration, 3)
+        }})
+        return self.warmer_status()
+    
+    def start_warmer(self):
+        """Warm the cache now and then every RECOMMENDATIONS_WARM_INTERVAL_SECONDS"""
+        if self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_loop())
+    
+    async def stop_warmer(self):
+        """Stop periodic warming"""
+        if self._warm_task:
+            self._warm_task.cancel()
+            self._warm_task = None
+    
+    def warmer_status(self) -> Dict[str, Any]:
+        """Get warmer counters"""
+        return {
+            "running": self._warm_task is not None,
+            "product_ids": len(settings.RECOMMENDATIONS_WARM_PRODUCT_IDS),
+            "interval_seconds": settings.RECOMMENDATIONS_WARM_INTERVAL_SECONDS,
+            "last_warm_at": (
+                datetime.fromtimestamp(self.last_warm_at, tz=timezone.utc).isoformat()
+                if self.last_warm_at else None
+            ),
+            "last_warm_duration_seconds": (
+                round(self.last_warm_duration, 3) if self.last_warm_duration is not None else None
+            ),
+            "warmed": self.warmed,
+            "warm_errors": self.warm_errors
+        }
+    
+    async def _warm_loop(self):
+        while True:
+            await self.warm_cache()
+            await asyncio.sleep(settings.RECOMMENDATIONS_WARM_INTERVAL_SECONDS)
+    
+    async def get_recommendations_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        timeout_seconds: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several recommendation requests concurrently under one deadline.
+        
+        Each request is a dict of get_recommendations keyword arguments. Results
+        come back in request order, each with its own success flag and error.
+        """
+        
+        tasks = [asyncio.create_task(self.get_recommendations(**request)) for request in requests]
+        done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+        
+        for task in pending:
+            task.cancel()
+        
+        results = []
+        for request, task in zip(requests, tasks):
+            if task in pending:
                 results.append({
-                    "id": result.id,
-                    "product": self._convert_product_to_dict(result.product)
+                    "model": request["model"],
+                    "success": False,
+                    "data": None,
+                    "error": f"Timed out after {timeout_seconds}s"
                 })
+                continue
             
-            return {
-                "results": results,
-                "attribution_token": response.attribution_token,
-                "missing_ids": list(response.missing_ids),
-                "validate_only": response.validate_only
-            }
+            data = task.result()
+            error = data.get("error")
+            results.append({
+                "model": request["model"],
+                "success": error is None,
+                "data": data,
+                "error": error
+            })
         
-        except Exception as e:
-            print(f"Recommendations error for model {model}: {e}")
-            # Return empty results instead of failing
-            return {
-                "results": [],
-                "attribution_token": "",
-                "missing_ids": [],
-                "validate_only": False,
-                "error": str(e)
-            }
+        return results
     
     def get_available_models(self) -> List[Dict[str, Any]]:
         """Get available recommendation models"""
@@ -93,36 +268,48 @@ class RecommendationsService:
                 "id": "recently_viewed",
                 "name": "Recently Viewed",
                 "description": "Products the user has recently viewed",
-                "serving_config": settings.MODEL_RECENTLY_VIEWED
+                "serving_config": settings.MODEL_RECENTLY_VIEWED,
+                "personalized": True
             },
             {
                 "id": "others_you_may_like",
                 "name": "Others You May Like",
                 "description": "Personalized recommendations based on user behavior",
-                "serving_config": settings.MODEL_OTHERS_YOU_MAY_LIKE
+                "serving_config": settings.MODEL_OTHERS_YOU_MAY_LIKE,
+                "personalized": True
             },
             {
                 "id": "similar_items",
                 "name": "Similar Products",
                 "description": "Products similar to the current product",
                 "serving_config": settings.MODEL_SIMILAR_ITEMS,
-                "requires_product_id": True
+                "requires_product_id": True,
+                "personalized": False
             },
             {
                 "id": "frequently_bought_together",
                 "name": "Frequently Bought Together",
                 "description": "Products often purchased together",
                 "serving_config": settings.MODEL_FREQUENTLY_BOUGHT_TOGETHER,
-                "requires_product_id": True
+                "requires_product_id": True,
+                "personalized": False
             },
             {
                 "id": "recommended_for_you",
                 "name": "Recommended For You",
                 "description": "Personalized product recommendations",
-                "serving_config": settings.MODEL_RECOMMENDED_FOR_YOU
+                "serving_config": settings.MODEL_RECOMMENDED_FOR_YOU,
+                "personalized": True
             }
         ]
     
+    def _is_personalized(self, model_id: str) -> bool:
+        """Whether a model's results depend on the visitor (unknown models count as personalized)"""
+        for model in self.get_available_models():
+            if model["id"] == model_id:
+                return model["personalized"]
+        return True
+    
     def _get_serving_config(self, model_id: str) -> str:
         """Map model ID to serving config"""
         model_map = {
@@ -137,61 +324,6 @@ class RecommendationsService:
     def _generate_visitor_id(self) -> str:
         """Generate a visitor ID"""
         return f"visitor_{uuid.uuid4().hex[:16]}"
-    
-    def _convert_product_to_dict(self, product) -> Dict[str, Any]:
-        """Convert Product protobuf to dict"""
-        # Extract price info (API uses priceInfo, not price_info)
-        price_info = None
-        if hasattr(product, 'priceInfo') and product.priceInfo:
-            pi = product.priceInfo
-            price_info = {
-                "currency_code": pi.currencyCode if hasattr(pi, 'currencyCode') else 'USD',
-                "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
-                "original_price": float(pi.originalPrice) if hasattr(pi, 'originalPrice') else None,
-                "cost": float(pi.cost) if hasattr(pi, 'cost') else None
-            }
-        elif hasattr(product, 'price_info') and product.price_info:
-            # Fallback for snake_case
-            pi = product.price_info
-            price_info = {
-                "currency_code": pi.currency_code if hasattr(pi, 'currency_code') else 'USD',
-                "price": float(pi.price) if hasattr(pi, 'price') else 0.0,
-                "original_price": float(pi.original_price) if hasattr(pi, 'original_price') else None,
-                "cost": float(pi.cost) if hasattr(pi, 'cost') else None
-            }
-        
-        # Extract images
-        images = []
-        if hasattr(product, 'images') and product.images:
-            for img in product.images:
-                images.append({
-                    "uri": img.uri if hasattr(img, 'uri') else '',
-                    "height": img.height if hasattr(img, 'height') else 0,
-                    "width": img.width if hasattr(img, 'width') else 0
-                })
-        
-        # Extract attributes
-        attributes = {}
-        if hasattr(product, 'attributes') and product.attributes:
-            for key, value in product.attributes.items():
-                if hasattr(value, 'text') and value.text:
-                    attributes[key] = list(value.text)
-                elif hasattr(value, 'numbers') and value.numbers:
-                    attributes[key] = list(value.numbers)
-        
-        return {
-            "id": product.id if hasattr(product, 'id') else '',
-            "name": product.name if hasattr(product, 'name') else '',
-            "title": product.title if hasattr(product, 'title') else 'Untitled Product',
-            "description": product.description if hasattr(product, 'description') else '',
-            "categories": list(product.categories) if hasattr(product, 'categories') else [],
-            "brands": list(product.brands) if hasattr(product, 'brands') else [],
-            "price_info": price_info,
-            "availability": product.availability if hasattr(product, 'availability') else 'UNKNOWN',
-            "uri": product.uri if hasattr(product, 'uri') else '',
-            "images": images,
-            "attributes": attributes
-        }
 
 # Singleton instance
 recommendations_service = RecommendationsService()
@@ -0,0 +1,260 @@
+from google.api_core import exceptions
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import logging
+import time
+
+from config import settings
+from metrics import registry, track_upstream, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+_CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_OPEN: 1, CIRCUIT_HALF_OPEN: 2}
+
+hedged_requests = registry.add(Counter(
+    "retail_hedged_requests_total",
+    "Duplicate Retail API calls sent after the hedge delay",
+    labels=("rpc",)
+))
+hedge_wins = registry.add(Counter(
+    "retail_hedge_wins_total",
+    "Hedged calls where the duplicate answered first",
+    labels=("rpc",)
+))
+circuit_state = registry.add(Gauge(
+    "retail_circuit_state",
+    "Circuit breaker state per RPC (0 closed, 1 open, 2 half-open)",
+    labels=("rpc",)
+))
+circuit_rejections = registry.add(Counter(
+    "retail_circuit_rejections_total",
+    "Calls failed fast because the circuit was open",
+    labels=("rpc",)
+))
+
+class CircuitOpenError(exceptions.ServiceUnavailable):
+    """Raised instead of calling the Retail API while an RPC's circuit is open"""
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error says the upstream is unhealthy (as opposed to a bad request)"""
+    if isinstance(error, (exceptions.TooManyRequests, exceptions.ServerError, asyncio.TimeoutError)):
+        return True
+    return not isinstance(error, exceptions.GoogleAPICallError)
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding window of recent calls.
+    
+    Opens once at least RETAIL_CIRCUIT_MIN_CALLS of the last RETAIL_CIRCUIT_WINDOW
+    calls were made and RETAIL_CIRCUIT_ERROR_RATE of them failed. After
+    RETAIL_CIRCUIT_OPEN_SECONDS one trial call is let through; its outcome
+    closes the circuit or opens it again.
+    """
+    
+    def __init__(self, rpc: str):
+        self.rpc = rpc
+        self.state = CIRCUIT_CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=settings.RETAIL_CIRCUIT_WINDOW)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        circuit_state.set(rpc, value=0)
+    
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go upstream"""
+        if self.state == CIRCUIT_CLOSED:
+            return
+        
+        if self.state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= settings.RETAIL_CIRCUIT_OPEN_SECONDS:
+            self._set_state(CIRCUIT_HALF_OPEN)
+        
+        if self.state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        
+        circuit_rejections.inc(self.rpc)
+        raise CircuitOpenError(f"Circuit open for {self.rpc}")
+    
+    def record(self, success: bool):
+        """Record the outcome of a call that went upstream"""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._trial_in_flight = False
+            if success:
+                self._outcomes.clear()
+                self._set_state(CIRCUIT_CLOSED)
+            else:
+                self._open()
+            return
+        
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == CIRCUIT_CLOSED
+            and len(self._outcomes) >= settings.RETAIL_CIRCUIT_MIN_CALLS
+            and failures / len(self._outcomes) >= settings.RETAIL_CIRCUIT_ERROR_RATE
+        ):
+            self._open()
+    
+    def abandon(self):
+        """Forget a call that was cancelled before it finished"""
+        # An unfinished half-open trial must not block the next one
+        self._trial_in_flight = False
+    
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._set_state(CIRCUIT_OPEN)
+    
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning("Retail API circuit %s", state, extra={"fields": {"rpc": self.rpc}})
+        self.state = state
+        circuit_state.set(self.rpc, value=_CIRCUIT_STATE_VALUES[state])
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failures": self._outcomes.count(False)
+        }
+
+class LatencyTracker:
+    """Recent successful call latencies, used to pick the hedge delay"""
+    
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+    
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Latency at the given percentile, or None until RETAIL_HEDGE_MIN_SAMPLES are in"""
+        if len(self._samples) < settings.RETAIL_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+class RetailUpstream:
+    """
+    Resilience layer around Retail API calls.
+    
+    Every call gets a deadline from RETAIL_RPC_TIMEOUTS and goes through a
+    per-RPC circuit breaker. Idempotent reads can be hedged: if the first
+    attempt has not answered by the RPC's recent RETAIL_HEDGE_PERCENTILE
+    latency, a duplicate is sent and whichever answers first wins.
+    """
+    
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+    
+    def timeout_for(self, rpc: str) -> float:
+        """Deadline for one attempt of an RPC, in seconds"""
+        return settings.RETAIL_RPC_TIMEOUTS.get(rpc, settings.RETAIL_RPC_TIMEOUT_SECONDS)
+    
+    async def call(
+        self,
+        rpc: str,
+        target: str,
+        fn: Callable[[float], Awaitable[Any]],
+        hedge: bool = False
+    ) -> Any:
+        """
+        Make a Retail API call; fn(timeout) issues one attempt.
+        
+        Raises CircuitOpenError without calling fn while the RPC's circuit is open.
+        """
+        breaker = self._breaker(rpc) if settings.RETAIL_CIRCUIT_BREAKER_ENABLED else None
+        if breaker:
+            breaker.before_call()
+        
+        try:
+            if hedge and settings.RETAIL_HEDGING_ENABLED:
+                result = await self._hedged(rpc, target, fn)
+            else:
+                result = await self._attempt(rpc, target, fn)
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.abandon()
+            raise
+        except Exception as e:
+            if breaker:
+                breaker.record(not _is_upstream_failure(e))
+            raise
+        
+        if breaker:
+            breaker.record(True)
+        return result
+    
+    async def _attempt(self, rpc: str, target: str, fn: Callable[[float], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        async with track_upstream(rpc, target):
+            result = await fn(self.timeout_for(rpc))
+        self._tracker(rpc).observe(time.perf_counter() - started)
+        return result
+    
+    async def _hedged(self, rpc: str, target: str, fn: Callable[[float], Awaitable[Any]]) -> Any:
+        delay = self._tracker(rpc).percentile(settings.RETAIL_HEDGE_PERCENTILE)
+        if delay is None:
+            return await self._attempt(rpc, target, fn)
+        delay = max(delay, settings.RETAIL_HEDGE_MIN_DELAY_SECONDS)
+        
+        primary = asyncio.ensure_future(self._attempt(rpc, target, fn))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            
+            hedged_requests.inc(rpc)
+            hedge = asyncio.ensure_future(self._attempt(rpc, target, fn))
+            pending = {primary, hedge}
+            
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            hedge_wins.inc(rpc)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        
+        finally:
+            # Cancel the losing attempt (or both, if the caller was cancelled)
+            for task in pending:
+                task.cancel()
+    
+    def _breaker(self, rpc: str) -> CircuitBreaker:
+        breaker = self._breakers.get(rpc)
+        if breaker is None:
+            breaker = self._breakers[rpc] = CircuitBreaker(rpc)
+        return breaker
+    
+    def _tracker(self, rpc: str) -> LatencyTracker:
+        tracker = self._latencies.get(rpc)
+        if tracker is None:
+            tracker = self._latencies[rpc] = LatencyTracker(settings.RETAIL_HEDGE_WINDOW)
+        return tracker
+    
+    def status(self) -> Dict[str, Any]:
+        """Get circuit state and hedge delay per RPC"""
+        status = {}
+        for rpc in sorted(set(self._breakers) | set(self._latencies)):
+            breaker = self._breakers.get(rpc)
+            tracker = self._latencies.get(rpc)
+            delay = tracker.percentile(settings.RETAIL_HEDGE_PERCENTILE) if tracker else None
+            status[rpc] = {
+                "timeout_seconds": self.timeout_for(rpc),
+                "circuit": breaker.status() if breaker else None,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None
+            }
+        return status
+
+# Singleton instance
+retail_upstream = RetailUpstream()
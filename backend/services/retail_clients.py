@@ -0,0 +1,150 @@
+from google.cloud.retail_v2 import (
+    CompletionServiceAsyncClient,
+    PredictionServiceAsyncClient,
+    ProductServiceAsyncClient,
+    SearchServiceAsyncClient
+)
+from google.auth.transport.requests import Request
+from typing import Any, Dict, List, Optional, Tuple
+import google.auth
+import asyncio
+import grpc
+import itertools
+import logging
+import time
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_CLIENT_CLASSES = {
+    "search": SearchServiceAsyncClient,
+    "completion": CompletionServiceAsyncClient,
+    "product": ProductServiceAsyncClient,
+    "prediction": PredictionServiceAsyncClient
+}
+
+class RetailClients:
+    """
+    Central factory for Retail API clients.
+    
+    All clients share a pool of RETAIL_CHANNEL_POOL_SIZE gRPC channels to the
+    Retail endpoint, so services reuse connections and TLS sessions instead of
+    each opening their own. Each call picks the next channel round-robin.
+    Nothing is created at import: credentials and channels are set up by
+    warmup() during startup, or on first use (channels bind to the running
+    event loop).
+    """
+    
+    def __init__(self):
+        self._credentials: Optional[Any] = None
+        self._channels: List[Any] = []
+        self._clients: Dict[Tuple[str, int], Any] = {}
+        self._next = {kind: itertools.count() for kind in _CLIENT_CLASSES}
+    
+    def search(self) -> SearchServiceAsyncClient:
+        return self._client("search")
+    
+    def completion(self) -> CompletionServiceAsyncClient:
+        return self._client("completion")
+    
+    def product(self) -> ProductServiceAsyncClient:
+        return self._client("product")
+    
+    def prediction(self) -> PredictionServiceAsyncClient:
+        return self._client("prediction")
+    
+    async def warmup(self) -> None:
+        """
+        Resolve credentials off the event loop and, with RETAIL_CHANNEL_WARMUP,
+        fetch an access token and open every channel in the pool, so the first
+        requests skip auth and connection setup.
+        """
+        started = time.monotonic()
+        
+        async def warm():
+            if settings.RETAIL_API_INSECURE:
+                if settings.RETAIL_CHANNEL_WARMUP:
+                    await asyncio.gather(*(channel.channel_ready() for channel in self._get_channels()))
+                return
+            
+            # Credential discovery and token fetches block on HTTP, so keep them off the loop
+            credentials = await asyncio.to_thread(self._get_credentials)
+            if settings.RETAIL_CHANNEL_WARMUP:
+                await asyncio.gather(
+                    asyncio.to_thread(credentials.refresh, Request()),
+                    *(channel.channel_ready() for channel in self._get_channels())
+                )
+        
+        try:
+            await asyncio.wait_for(warm(), timeout=settings.RETAIL_CHANNEL_WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            # Not fatal: channels keep connecting in the background
+            logger.warning("Retail client warmup not finished after %ss", settings.RETAIL_CHANNEL_WARMUP_TIMEOUT_SECONDS)
+            return
+        except Exception as e:
+            logger.warning("Retail client warmup error: %s", e)
+            return
+        
+        logger.info("Retail clients ready", extra={"fields": {
+            "channels_opened": len(self._channels),
+            "duration_seconds": round(time.monotonic() - started, 3)
+        }})
+    
+    async def close(self) -> None:
+        """Close all channels"""
+        channels, self._channels = self._channels, []
+        self._clients.clear()
+        for channel in channels:
+            await channel.close()
+    
+    def _client(self, kind: str):
+        index = next(self._next[kind]) % settings.RETAIL_CHANNEL_POOL_SIZE
+        client = self._clients.get((kind, index))
+        if client is None:
+            client_class = _CLIENT_CLASSES[kind]
+            transport_class = client_class.get_transport_class("grpc_asyncio")
+            channel = self._get_channels()[index]
+            client = self._clients[(kind, index)] = client_class(transport=transport_class(channel=channel))
+        return client
+    
+    def _get_channels(self) -> List[Any]:
+        if not self._channels and settings.RETAIL_API_INSECURE:
+            # Plaintext and unauthenticated, for local fakes and emulators
+            self._channels = [
+                grpc.aio.insecure_channel(settings.RETAIL_API_ENDPOINT, options=self._channel_options())
+                for _ in range(settings.RETAIL_CHANNEL_POOL_SIZE)
+            ]
+        elif not self._channels:
+            transport_class = SearchServiceAsyncClient.get_transport_class("grpc_asyncio")
+            self._channels = [
+                transport_class.create_channel(
+                    settings.RETAIL_API_ENDPOINT,
+                    credentials=self._get_credentials(),
+                    options=self._channel_options()
+                )
+                for _ in range(settings.RETAIL_CHANNEL_POOL_SIZE)
+            ]
+        return self._channels
+    
+    def _get_credentials(self):
+        if self._credentials is None:
+            scopes = SearchServiceAsyncClient.get_transport_class("grpc_asyncio").AUTH_SCOPES
+            self._credentials, _ = google.auth.default(scopes=scopes)
+        return self._credentials
+    
+    def _channel_options(self) -> List[Tuple[str, Any]]:
+        return [
+            # Without a local subchannel pool, gRPC would share one connection
+            # across channels with identical arguments, defeating the pool
+            ("grpc.use_local_subchannel_pool", 1),
+            ("grpc.keepalive_time_ms", int(settings.RETAIL_KEEPALIVE_TIME_SECONDS * 1000)),
+            ("grpc.keepalive_timeout_ms", int(settings.RETAIL_KEEPALIVE_TIMEOUT_SECONDS * 1000)),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1)
+        ]
+
+# Singleton instance
+retail_clients = RetailClients()
@@ -1,19 +1,36 @@
-from google.cloud.retail_v2 import SearchServiceClient, CompletionServiceClient, ProductServiceClient
-from google.cloud.retail_v2.types import SearchRequest, CompleteQueryRequest, GetProductRequest
-from google.protobuf import field_mask_pb2
-from typing import Dict, Any, List
+from google.cloud.retail_v2 import SearchServiceAsyncClient, CompletionServiceAsyncClient
+from google.cloud.retail_v2.types import SearchRequest, CompleteQueryRequest, Product
+from typing import Dict, Any, List, Optional, Tuple
 import uuid
-import traceback
+import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import logging
 
 from config import settings
+from metrics import record_stage
+from services.products_service import products_service
+from services.search_cache import search_cache
+from services.search_window import search_window
+from services.autocomplete_cache import autocomplete_cache
+from services.product_converter import product_to_dict
+from services.singleflight import SingleFlight, request_key
+from services.resilience import retail_upstream, CircuitOpenError
+from services.retail_clients import retail_clients
+
+logger = logging.getLogger(__name__)
 
 class RetailSearchService:
     def __init__(self):
-        self.search_client = SearchServiceClient()
-        self.completion_client = CompletionServiceClient()
-        self.product_client = ProductServiceClient()
+        # Identical searches in flight at the same time share one RPC
+        self._search_flight = SingleFlight("search")
+    
+    @property
+    def search_client(self) -> SearchServiceAsyncClient:
+        return retail_clients.search()
+    
+    @property
+    def completion_client(self) -> CompletionServiceAsyncClient:
+        return retail_clients.completion()
     
     async def search(
         self,
@@ -23,22 +40,140 @@ class RetailSearchService:
         offset: int = 0,
         filter: str = "",
         order_by: str = "",
-        facet_specs: List[Dict[str, Any]] = None
+        facet_specs: List[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Execute a search query"""
-        
-        placement = settings.get_placement_path(settings.RETAIL_SEARCH_PLACEMENT)
-        
-        print(f"\n🔍 SEARCH REQUEST:")
-        print(f"   Query: '{query}'")
-        print(f"   Filter: '{filter}'")
-        print(f"   Page size: {page_size}, Offset: {offset}")
-        print(f"   Placement: {placement}")
+        """Execute a search query, through the response cache when enabled"""
         
         # Build facet specs
         if not facet_specs:
             facet_specs = self._get_default_facet_specs()
         
+        # Unless the placement personalizes results, visitors share in-flight
+        # searches and windows; the first caller's visitor_id goes upstream
+        shared_visitor_id = None if search_cache.shared_across_visitors(settings.RETAIL_SEARCH_PLACEMENT) else visitor_id
+        
+        flight_key = request_key(
+            query=query,
+            visitor_id=shared_visitor_id,
+            page_size=page_size,
+            offset=offset,
+            filter=filter,
+            order_by=order_by,
+            facet_specs=facet_specs,
+            fields=fields
+        )
+        
+        async def fetch_page(size: int, start: int) -> Dict[str, Any]:
+            return await self._execute_search(
+                query=query,
+                visitor_id=visitor_id,
+                page_size=size,
+                offset=start,
+                filter=filter,
+                order_by=order_by,
+                facet_specs=facet_specs,
+                fields=fields
+            )
+        
+        async def fetch() -> Dict[str, Any]:
+            if settings.SEARCH_WINDOW_ENABLED and search_window.applies(page_size, offset):
+                session_key = request_key(
+                    placement=settings.RETAIL_SEARCH_PLACEMENT,
+                    query=query,
+                    visitor_id=shared_visitor_id,
+                    page_size=page_size,
+                    filter=filter,
+                    order_by=order_by,
+                    facet_specs=facet_specs,
+                    fields=fields
+                )
+                return await search_window.get_page(session_key, page_size, offset, fetch_page)
+            return await self._search_flight.do(flight_key, lambda: fetch_page(page_size, offset))
+        
+        if not settings.SEARCH_CACHE_ENABLED:
+            return await fetch()
+        
+        cache_key = search_cache.make_key(
+            placement=settings.RETAIL_SEARCH_PLACEMENT,
+            query=query,
+            visitor_id=visitor_id,
+            page_size=page_size,
+            offset=offset,
+            filter=filter,
+            order_by=order_by,
+            facet_specs=facet_specs,
+            fields=fields
+        )
+        if cache_key is None:
+            return await fetch()
+        
+        return await search_cache.get_or_fetch(cache_key, settings.RETAIL_SEARCH_PLACEMENT, fetch)
+    
+    async def search_multi(
+        self,
+        searches: List[Dict[str, Any]],
+        concurrency: int,
+        timeout_seconds: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several searches concurrently under one deadline.
+        
+        Each search is a dict of search() keyword arguments. At most concurrency
+        searches run at once. Results come back in request order; a failed or
+        timed out search is reported in its own slot without affecting the others.
+        """
+        
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def run(search: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.search(**search)
+        
+        tasks = [asyncio.create_task(run(search)) for search in searches]
+        done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+        
+        for task in pending:
+            task.cancel()
+        
+        results = []
+        for task in tasks:
+            if task in pending:
+                results.append({"success": False, "data": None, "error": f"Timed out after {timeout_seconds}s"})
+                continue
+            
+            error = task.exception()
+            if error is not None:
+                logger.warning("Multi-search item failed: %s", error)
+                results.append({"success": False, "data": None, "error": str(error)})
+            else:
+                results.append({"success": True, "data": task.result(), "error": None})
+        
+        return results
+    
+    async def _execute_search(
+        self,
+        query: str,
+        visitor_id: str,
+        page_size: int,
+        offset: int,
+        filter: str,
+        order_by: str,
+        facet_specs: List[Dict[str, Any]],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Run a search against the Retail API"""
+        
+        placement = settings.get_placement_path(settings.RETAIL_SEARCH_PLACEMENT)
+        
+        logger.debug("Search request", extra={"fields": {
+            "query": query,
+            "filter": filter,
+            "page_size": page_size,
+            "offset": offset,
+            "placement": placement
+        }})
+        
         # Build request
         request = SearchRequest(
             placement=placement,
@@ -53,86 +188,72 @@ class RetailSearchService:
         )
         
         try:
-            response = self.search_client.search(request)
+            response = await retail_upstream.call(
+                "search",
+                settings.RETAIL_SEARCH_PLACEMENT,
+                lambda timeout: self.search_client.search(request, timeout=timeout)
+            )
             
-            print(f"✅ SEARCH RESPONSE:")
-            print(f"   Total products: {response.total_size}")
+            logger.debug("Search response", extra={"fields": {"total_size": response.total_size}})
             
-            # Convert results and fetch full data if needed
+            # Convert results, noting the ones the search index returned without a title
             results = []
-            for idx, result in enumerate(response.results):
-                product_dict = self._convert_product_to_dict(result.product)
-                
-                # Check if we need to fetch full product data
-                product_id = product_dict.get('id')
-                title = product_dict.get('title', '')
-                
-                # If title is empty, fetch full product details
-                if (not title or title.strip() == '') and product_id:
-                    print(f"   🔄 Fetching full product data for {product_id}...")
-                    try:
-                        full_product_name = f"{settings.branch_path}/products/{product_id}"
-                        get_request = GetProductRequest(name=full_product_name)
-                        full_product = self.product_client.get_product(get_request)
-                        
-                        # Debug: Print raw product data
-                        print(f"      Raw product fetched:")
-                        print(f"        - id: {full_product.id}")
-                        print(f"        - title: {full_product.title}")
-                        print(f"        - has price_info: {hasattr(full_product, 'price_info')}")
-                        if hasattr(full_product, 'price_info') and full_product.price_info:
-                            print(f"        - price: {full_product.price_info.price}")
-                        print(f"        - has images: {hasattr(full_product, 'images')}")
-                        if hasattr(full_product, 'images') and full_product.images:
-                            print(f"        - images count: {len(full_product.images)}")
-                        
-                        product_dict = self._convert_product_to_dict(full_product)
-                        print(f"      ✅ Converted:")
-                        print(f"        - title: {product_dict.get('title')}")
-                        print(f"        - price: {product_dict.get('price_info')}")
-                        print(f"        - images: {len(product_dict.get('images', []))} images")
-                    except Exception as e:
-                        print(f"      ❌ Failed to fetch: {e}")
-                        traceback.print_exc()
-                
-                if idx < 3:  # Log first 3 products
-                    print(f"   Product {idx + 1}:")
-                    print(f"      ID: {product_dict.get('id')}")
-                    print(f"      Title: {product_dict.get('title')}")
-                    print(f"      Price Info: {product_dict.get('price_info')}")
-                
-                results.append({
+            sparse = []
+            for result in response.results:
+                product = Product.pb(result.product)
+                item = {
                     "id": result.id,
-                    "product": product_dict
-                })
+                    "product": product_to_dict(product, fields)
+                }
+                results.append(item)
+                
+                if not product.title.strip():
+                    product_id = product.id or product.name.rsplit('/', 1)[-1]
+                    if product_id:
+                        sparse.append((item, product_id))
             
-            facets = []
-            for facet in response.facets:
-                facets.append({
-                    "key": facet.key,
-                    "values": [
-                        {
-                            "value": fv.value,
-                            "count": fv.count
-                        }
-                        for fv in facet.values
-                    ]
-                })
+            # Fetch full data for the sparse results
+            hydration = await self._hydrate_results(sparse, fields)
+            
+            for idx, item in enumerate(results[:3]):  # Log first 3 products
+                product_dict = item["product"]
+                logger.debug("Search result", extra={"fields": {
+                    "position": idx + 1,
+                    "id": product_dict.get('id'),
+                    "title": product_dict.get('title'),
+                    "price_info": product_dict.get('price_info')
+                }})
             
             return {
                 "results": results,
                 "total_size": response.total_size,
-                "facets": facets,
+                "facets": self._convert_facets(response.facets),
                 "attribution_token": response.attribution_token,
                 "next_page_token": response.next_page_token,
-                "corrected_query": response.corrected_query
+                "corrected_query": response.corrected_query,
+                "hydration": hydration
             }
         
         except Exception as e:
-            print(f"\n❌ SEARCH ERROR: {e}")
-            print(f"   Error type: {type(e).__name__}")
+            logger.error("Search error: %s", e, extra={"fields": {"error_type": type(e).__name__}})
             raise
     
+    def _convert_facets(self, facets) -> List[Dict[str, Any]]:
+        """Flatten response facets into key/values dicts"""
+        return [
+            {
+                "key": facet.key,
+                "values": [
+                    {
+                        "value": fv.value,
+                        "count": fv.count
+                    }
+                    for fv in facet.values
+                ]
+            }
+            for facet in facets
+        ]
+    
     async def autocomplete(
         self,
         query: str,
@@ -141,6 +262,11 @@ class RetailSearchService:
     ) -> Dict[str, Any]:
         """Get autocomplete suggestions"""
         
+        if settings.AUTOCOMPLETE_CACHE_ENABLED:
+            cached = await autocomplete_cache.get(query, max_suggestions)
+            if cached is not None:
+                return cached
+        
         catalog = settings.catalog_path
         
         request = CompleteQueryRequest(
@@ -151,7 +277,12 @@ class RetailSearchService:
         )
         
         try:
-            response = self.completion_client.complete_query(request)
+            response = await retail_upstream.call(
+                "complete_query",
+                settings.RETAIL_CATALOG_ID,
+                lambda timeout: self.completion_client.complete_query(request, timeout=timeout),
+                hedge=True
+            )
             
             suggestions = []
             for result in response.completion_results:
@@ -160,15 +291,76 @@ class RetailSearchService:
                     "attributes": dict(result.attributes) if result.attributes else {}
                 })
             
-            return {
+            results = {
                 "suggestions": suggestions,
                 "attribution_token": response.attribution_token
             }
+            
+            if settings.AUTOCOMPLETE_CACHE_ENABLED:
+                autocomplete_cache.set(query, max_suggestions, results)
+            
+            return results
+        
+        except CircuitOpenError:
+            # Suggestions are optional: degrade to none rather than fail the page
+            return {"suggestions": [], "attribution_token": "", "degraded": True}
         
         except Exception as e:
-            print(f"Autocomplete error: {e}")
+            logger.error("Autocomplete error: %s", e)
             raise
     
+    async def _hydrate_results(
+        self,
+        sparse: List[Tuple[Dict[str, Any], str]],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Replace sparse search results (empty title) with full product data.
+        
+        Lookups run concurrently, capped at SEARCH_HYDRATION_CONCURRENCY, and the
+        whole stage is bounded by SEARCH_HYDRATION_TIMEOUT_SECONDS. Results that are
+        not hydrated before the deadline are returned as the search index sent them.
+        """
+        
+        started = time.perf_counter()
+        
+        if not sparse:
+            return {"requested": 0, "hydrated": 0, "failed": 0, "timed_out": 0, "duration_ms": 0.0}
+        
+        semaphore = asyncio.Semaphore(max(1, settings.SEARCH_HYDRATION_CONCURRENCY))
+        
+        async def hydrate(item: Dict[str, Any], product_id: str) -> None:
+            async with semaphore:
+                logger.debug("Fetching full product data", extra={"fields": {"product_id": product_id}})
+                full_product = await products_service.get_product_message(product_id)
+            item["product"] = product_to_dict(full_product, fields)
+        
+        tasks = [asyncio.create_task(hydrate(item, product_id)) for item, product_id in sparse]
+        done, not_done = await asyncio.wait(tasks, timeout=settings.SEARCH_HYDRATION_TIMEOUT_SECONDS)
+        
+        for task in not_done:
+            task.cancel()
+        
+        failed = 0
+        for task in done:
+            error = task.exception()
+            if error is not None:
+                failed += 1
+                logger.warning("Hydration fetch failed: %s", error)
+        
+        elapsed = time.perf_counter() - started
+        record_stage("hydration", elapsed)
+        
+        stats = {
+            "requested": len(sparse),
+            "hydrated": len(done) - failed,
+            "failed": failed,
+            "timed_out": len(not_done),
+            "duration_ms": round(elapsed * 1000, 2)
+        }
+        logger.debug("Search hydration", extra={"fields": stats})
+        return stats
+    
     def _get_default_facet_specs(self) -> List[Dict[str, Any]]:
         """Get default facet specifications"""
         return [
@@ -201,59 +393,6 @@ class RetailSearchService:
     def _generate_visitor_id(self) -> str:
         """Generate a visitor ID"""
         return f"visitor_{uuid.uuid4().hex[:16]}"
-    
-    def _convert_product_to_dict(self, product) -> Dict[str, Any]:
-        """Convert Product protobuf to dict"""
-        
-        # Extract product ID from name field if id is empty
-        product_id = product.id
-        if not product_id and product.name:
-            product_id = product.name.split('/')[-1]
-        
-        # Extract price info
-        price_info = None
-        if hasattr(product, 'price_info') and product.price_info:
-            pi = product.price_info
-            if hasattr(pi, 'price') and pi.price:
-                price_info = {
-                    "currency_code": pi.currency_code if hasattr(pi, 'currency_code') else 'USD',
-                    "price": float(pi.price) if pi.price else 0.0,
-                    "original_price": float(pi.original_price) if hasattr(pi, 'original_price') and pi.original_price else None,
-                    "cost": float(pi.cost) if hasattr(pi, 'cost') and pi.cost else None
-                }
-        
-        # Extract images
-        images = []
-        if hasattr(product, 'images') and product.images:
-            for img in product.images:
-                images.append({
-                    "uri": img.uri if hasattr(img, 'uri') else '',
-                    "height": img.height if hasattr(img, 'height') else 0,
-                    "width": img.width if hasattr(img, 'width') else 0
-                })
-        
-        # Extract attributes
-        attributes = {}
-        if hasattr(product, 'attributes') and product.attributes:
-            for key, value in product.attributes.items():
-                if hasattr(value, 'text') and value.text:
-                    attributes[key] = list(value.text)
-                elif hasattr(value, 'numbers') and value.numbers:
-                    attributes[key] = list(value.numbers)
-        
-        return {
-            "id": product_id,
-            "name": product.name if hasattr(product, 'name') else '',
-            "title": product.title if product.title else '',
-            "description": product.description if hasattr(product, 'description') else '',
-            "categories": list(product.categories) if hasattr(product, 'categories') else [],
-            "brands": list(product.brands) if hasattr(product, 'brands') else [],
-            "price_info": price_info,
-            "availability": product.availability if hasattr(product, 'availability') else 'UNKNOWN',
-            "uri": product.uri if hasattr(product, 'uri') else '',
-            "images": images,
-            "attributes": attributes
-        }
 
 # Singleton instance
 retail_search_service = RetailSearchService()
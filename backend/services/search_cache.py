@@ -0,0 +1,158 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+
+from config import settings
+from metrics import registry
+from services.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# How visitor_id takes part in the cache key
+VISITOR_POLICY_IGNORE = "ignore"                  # Shared by all visitors
+VISITOR_POLICY_PER_VISITOR = "per_visitor"        # Keyed per visitor when one is given
+VISITOR_POLICY_ANONYMOUS_ONLY = "anonymous_only"  # Requests with a visitor_id bypass the cache
+VISITOR_POLICY_BY_PLACEMENT = "by_placement"      # "ignore", except personalized placements are "anonymous_only"
+
+def fully_hydrated(response: Dict[str, Any]) -> bool:
+    """Whether no sparse result of a search response was left unhydrated (timed out or failed)"""
+    hydration = response.get("hydration") or {}
+    return not hydration.get("timed_out") and not hydration.get("failed")
+
+class SearchCache:
+    """
+    Search response cache keyed on a canonicalized search request.
+    
+    Entries are fresh for a per-placement TTL and then served stale for up to
+    SEARCH_CACHE_STALE_SECONDS while a single background task refreshes them.
+    Responses with incomplete hydration are returned but not stored, so one
+    slow product lookup does not pin untitled results in the cache.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        stale_seconds: float,
+        visitor_policy: str,
+        placement_ttls: Optional[Dict[str, float]] = None,
+        personalized_placements: Optional[List[str]] = None
+    ):
+        self._cache = TieredCache("search", max_entries=max_entries, ttl_seconds=ttl_seconds, stale_seconds=stale_seconds)
+        self.visitor_policy = visitor_policy
+        self.placement_ttls = placement_ttls or {}
+        self.personalized_placements = set(personalized_placements or [])
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.skipped_partial = 0
+    
+    def shared_across_visitors(self, placement: str) -> bool:
+        """Whether a placement's responses are the same for every visitor, so visitor_id is left out of keys"""
+        if self.visitor_policy == VISITOR_POLICY_IGNORE:
+            return True
+        if self.visitor_policy == VISITOR_POLICY_BY_PLACEMENT:
+            return placement not in self.personalized_placements
+        return False
+    
+    def make_key(
+        self,
+        placement: str,
+        query: str,
+        visitor_id: Optional[str],
+        page_size: int,
+        offset: int,
+        filter: str,
+        order_by: str,
+        facet_specs: List[Dict[str, Any]],
+        fields: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """Build the cache key for a search, or None if the request must bypass the cache"""
+        
+        shared = self.shared_across_visitors(placement)
+        if visitor_id and not shared and self.visitor_policy != VISITOR_POLICY_PER_VISITOR:
+            return None
+        
+        canonical = {
+            "placement": placement,
+            "query": " ".join(query.split()).lower(),
+            "visitor_id": None if shared else visitor_id,
+            "page_size": page_size,
+            "offset": offset,
+            "filter": filter.strip(),
+            "order_by": order_by.strip(),
+            "facet_specs": facet_specs,
+            "fields": fields
+        }
+        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    async def get_or_fetch(
+        self,
+        key: str,
+        placement: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Serve a cached response, refreshing stale entries in the background"""
+        
+        found = await self._cache.lookup(key)
+        
+        if found is not None:
+            value, stale = found
+            if stale and key not in self._refreshing:
+                self._refreshing[key] = asyncio.ensure_future(self._refresh(key, placement, fetch))
+            return value
+        
+        value = await fetch()
+        self._store(key, placement, value)
+        return value
+    
+    async def _refresh(
+        self,
+        key: str,
+        placement: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> None:
+        try:
+            value = await fetch()
+            self._store(key, placement, value)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep serving the stale entry until it falls out of its stale window
+            self.refresh_errors += 1
+            logger.warning("Search cache refresh error: %s", e)
+        finally:
+            self._refreshing.pop(key, None)
+    
+    def _store(self, key: str, placement: str, value: Dict[str, Any]) -> None:
+        if not fully_hydrated(value):
+            self.skipped_partial += 1
+            return
+        self._cache.set(key, value, ttl_seconds=self.placement_ttls.get(placement))
+    
+    def clear(self):
+        """Drop all cached responses"""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        stats = self._cache.stats()
+        stats["refreshes"] = self.refreshes
+        stats["refresh_errors"] = self.refresh_errors
+        stats["skipped_partial"] = self.skipped_partial
+        stats["refreshing"] = len(self._refreshing)
+        return stats
+
+# Singleton instance
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    stale_seconds=settings.SEARCH_CACHE_STALE_SECONDS,
+    visitor_policy=settings.SEARCH_CACHE_VISITOR_POLICY,
+    placement_ttls=settings.SEARCH_CACHE_PLACEMENT_TTLS,
+    personalized_placements=settings.SEARCH_CACHE_PERSONALIZED_PLACEMENTS
+)
+registry.register_cache("search", search_cache.stats)
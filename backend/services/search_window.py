@@ -0,0 +1,138 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import logging
+
+from config import settings
+from metrics import registry
+from services.cache import TieredCache
+from services.search_cache import fully_hydrated
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# fetch(window_size, window_start) runs one upstream search for a whole window
+WindowFetch = Callable[[int, int], Awaitable[Dict[str, Any]]]
+
+class SearchWindowCache:
+    """
+    Result windows for offset-paged search.
+    
+    A page request is answered from a window of up to `pages` pages fetched in
+    one upstream search and kept for a short TTL, keyed per session (the search
+    parameters without the offset, plus visitor_id on personalized placements).
+    Paging through the window costs no further upstream calls. Once a request
+    reaches the last `prefetch_pages` pages of its window, the next window is
+    fetched in the background. Windows with incomplete hydration are served
+    but not kept.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        pages: int,
+        max_results: int,
+        prefetch_pages: int
+    ):
+        self._cache = TieredCache("search_window", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # A page request for a window that is still being prefetched joins the prefetch
+        self._flight = SingleFlight("search_window")
+        self.pages = pages
+        self.max_results = max_results
+        self.prefetch_pages = prefetch_pages
+        
+        self.prefetches = 0
+        self.prefetch_errors = 0
+        self.skipped_partial = 0
+    
+    def window_size(self, page_size: int) -> int:
+        """Results per window for a page size (a whole number of pages)"""
+        return page_size * max(1, min(self.pages, self.max_results // max(1, page_size)))
+    
+    def applies(self, page_size: int, offset: int) -> bool:
+        """Whether a request can be served from windows"""
+        # Unaligned offsets could straddle two windows
+        return page_size > 0 and self.window_size(page_size) > page_size and offset % page_size == 0
+    
+    async def get_page(
+        self,
+        session_key: str,
+        page_size: int,
+        offset: int,
+        fetch: WindowFetch
+    ) -> Dict[str, Any]:
+        """Serve one page from its window, fetching the window if needed"""
+        size = self.window_size(page_size)
+        start = offset // size * size
+        key = f"{session_key}:{start}"
+        
+        window = await self._cache.get(key)
+        if window is None:
+            window = await self._flight.do(key, lambda: self._load(key, fetch, size, start))
+        
+        # Near the end of a full window, fetch the next one before it is asked for
+        remaining_pages = (start + size - offset) // page_size - 1
+        next_start = start + size
+        if (
+            remaining_pages < self.prefetch_pages
+            and len(window["results"]) >= size
+            and next_start < window["total_size"]
+        ):
+            self._prefetch(f"{session_key}:{next_start}", fetch, size, next_start)
+        
+        begin = offset - start
+        page = dict(window)
+        page["results"] = window["results"][begin:begin + page_size]
+        # The upstream token points past the whole window, not this page
+        page["next_page_token"] = ""
+        return page
+    
+    async def _load(self, key: str, fetch: WindowFetch, size: int, start: int) -> Dict[str, Any]:
+        window = await fetch(size, start)
+        # A window hydrates many more sparse results under the same deadline; a
+        # partial one would serve untitled results for every page in it
+        if fully_hydrated(window):
+            self._cache.set(key, window)
+        else:
+            self.skipped_partial += 1
+        return window
+    
+    def _prefetch(self, key: str, fetch: WindowFetch, size: int, start: int):
+        if self._cache.contains(key) or self._flight.in_flight(key):
+            return
+        
+        self.prefetches += 1
+        task = self._flight.start(key, lambda: self._load(key, fetch, size, start))
+        task.add_done_callback(self._prefetch_done)
+    
+    def _prefetch_done(self, task: asyncio.Future):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Nothing is cached, so the next request for this window fetches it itself
+            self.prefetch_errors += 1
+            logger.warning("Search window prefetch error: %s", error)
+    
+    def clear(self):
+        """Drop all windows"""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get window counters"""
+        stats = self._cache.stats()
+        stats["prefetches"] = self.prefetches
+        stats["prefetch_errors"] = self.prefetch_errors
+        stats["skipped_partial"] = self.skipped_partial
+        stats["in_flight"] = self._flight.stats()["in_flight"]
+        return stats
+
+# Singleton instance
+search_window = SearchWindowCache(
+    max_entries=settings.SEARCH_WINDOW_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_WINDOW_TTL_SECONDS,
+    pages=settings.SEARCH_WINDOW_PAGES,
+    max_results=settings.SEARCH_WINDOW_MAX_RESULTS,
+    prefetch_pages=settings.SEARCH_WINDOW_PREFETCH_PAGES
+)
+registry.register_cache("search_window", search_window.stats)
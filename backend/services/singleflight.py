@@ -0,0 +1,84 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import hashlib
+import json
+
+from metrics import registry, Counter, Gauge
+
+singleflight_calls = registry.add(Counter(
+    "singleflight_calls_total",
+    "Upstream calls started by a single-flight group",
+    labels=("group",)
+))
+singleflight_coalesced = registry.add(Counter(
+    "singleflight_coalesced_total",
+    "Callers that joined a call already in flight instead of starting their own",
+    labels=("group",)
+))
+singleflight_in_flight = registry.add(Gauge(
+    "singleflight_in_flight",
+    "Calls in flight per single-flight group",
+    labels=("group",)
+))
+
+def request_key(**parts: Any) -> str:
+    """Build a canonical key for a request from its parameters"""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one.
+    
+    The first caller for a key starts the call; callers arriving while it is in
+    flight wait on the same task and get its result or error. Nothing is kept
+    once the call completes, so this works with or without a cache in front.
+    """
+    
+    def __init__(self, group: str):
+        self.group = group
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn(), or join the call already in flight for key"""
+        # Shield the shared call so one cancelled caller does not cancel it for the rest
+        return await asyncio.shield(self.start(key, fn))
+    
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Start fn() in the background unless a call for key is in flight; returns the shared task"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            singleflight_coalesced.inc(self.group)
+            return task
+        
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        self.calls += 1
+        singleflight_calls.inc(self.group)
+        singleflight_in_flight.inc(self.group)
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+    
+    def in_flight(self, key: str) -> bool:
+        """Whether a call for key is in flight"""
+        return key in self._in_flight
+    
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        singleflight_in_flight.dec(self.group)
+        # Mark the error as retrieved in case every waiting caller was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
@@ -0,0 +1,11 @@
+"""
+Test setup: run with `python -m pytest tests` from backend/.
+
+Modules import each other from backend/ (e.g. `from config import settings`),
+and Settings needs a project ID, so both are provided before any import.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GCP_PROJECT_ID", "test-project")
@@ -0,0 +1,34 @@
+import asyncio
+
+from services.autocomplete_cache import AutocompleteCache
+
+def response(*suggestions):
+    return {"suggestions": [{"suggestion": s, "attributes": {}} for s in suggestions], "attribution_token": "token"}
+
+def texts(result):
+    return [s["suggestion"] for s in result["suggestions"]]
+
+def test_complete_prefix_result_serves_longer_prefix():
+    cache = AutocompleteCache(max_entries=100, ttl_seconds=60)
+    # Fewer suggestions than asked for: this is every suggestion for "dr"
+    cache.set("dr", 5, response("drill", "driver", "cordless drill", "dryer"))
+    
+    result = asyncio.run(cache.get("dri", 5))
+    
+    assert texts(result) == ["drill", "driver", "cordless drill"]
+    assert cache.stats()["prefix_hits"] == 1
+
+def test_truncated_prefix_result_is_not_reused():
+    cache = AutocompleteCache(max_entries=100, ttl_seconds=60)
+    # As many suggestions as asked for: more may exist upstream
+    cache.set("dr", 3, response("drill", "driver", "dryer"))
+    
+    assert asyncio.run(cache.get("dri", 3)) is None
+    assert cache.stats()["misses"] == 1
+
+def test_exact_prefix_serves_smaller_requests_only():
+    cache = AutocompleteCache(max_entries=100, ttl_seconds=60)
+    cache.set("Drill ", 3, response("drill", "drill bits", "drill press"))
+    
+    assert texts(asyncio.run(cache.get("drill", 2))) == ["drill", "drill bits"]
+    assert asyncio.run(cache.get("drill", 5)) is None
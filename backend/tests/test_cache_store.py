@@ -0,0 +1,152 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from benchmarks.fake_redis import FakeRedis, start_server
+from services.cache_store import RedisError, RedisStore, SQLiteStore
+
+def make_sqlite(tmp_path, busy_timeout_seconds=0.5):
+    return SQLiteStore(str(tmp_path / "cache.sqlite3"), read_threads=2, busy_timeout_seconds=busy_timeout_seconds)
+
+def test_sqlite_round_trip_and_expiry(tmp_path):
+    store = make_sqlite(tmp_path)
+    
+    async def run():
+        await store.set("p:v1:search:a", (b"head", b"body"), 60)
+        await store.set("p:v1:search:b", (b"short",), 0.05)
+        assert await store.get("p:v1:search:a") == b"headbody"
+        assert await store.get("p:v1:search:b") == b"short"
+        await asyncio.sleep(0.1)
+        assert await store.get("p:v1:search:b") is None
+        await store.delete("p:v1:search:a")
+        assert await store.get("p:v1:search:a") is None
+        await store.close()
+    
+    asyncio.run(run())
+
+def test_sqlite_clear_matches_the_prefix_exactly(tmp_path):
+    store = make_sqlite(tmp_path)
+    keys = [
+        "p:v1:search_window:a",
+        "p:v1:search_window:zé",
+        "p:v1:searchXwindow:b",
+        "p:v1:SEARCH_WINDOW:c",
+        "p:v1:search:d"
+    ]
+    
+    async def run():
+        for key in keys:
+            await store.set(key, (b"v",), 60)
+        await store.clear("p:v1:search_window:")
+        left = [key for key in keys if await store.get(key) is not None]
+        await store.close()
+        return left
+    
+    assert asyncio.run(run()) == keys[2:]
+
+def test_sqlite_reads_do_not_wait_for_a_blocked_write(tmp_path):
+    store = make_sqlite(tmp_path)
+    
+    async def run():
+        await store.set("p:v1:search:a", (b"value",), 60)
+        # Another process holds the write lock: our write waits on its busy timeout
+        other = sqlite3.connect(str(tmp_path / "cache.sqlite3"), isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        write = asyncio.ensure_future(store.set("p:v1:search:b", (b"value",), 60))
+        await asyncio.sleep(0.05)
+        
+        started = time.perf_counter()
+        value = await store.get("p:v1:search:a")
+        read_seconds = time.perf_counter() - started
+        
+        other.execute("ROLLBACK")
+        other.close()
+        await write
+        await store.close()
+        return value, read_seconds
+    
+    value, read_seconds = asyncio.run(run())
+    
+    assert value == b"value"
+    assert read_seconds < 0.2
+
+async def redis_store(max_connections=4):
+    fake = FakeRedis()
+    opened = []
+    handle = fake.handle
+    
+    async def counting_handle(reader, writer):
+        opened.append(1)
+        await handle(reader, writer)
+    
+    fake.handle = counting_handle
+    server, port = await start_server(fake)
+    return fake, server, opened, RedisStore(f"redis://127.0.0.1:{port}/0", max_connections)
+
+async def shutdown(store, server):
+    await store.close()
+    server.close()
+    # Let the server's handlers see the closed connections before the loop ends
+    await asyncio.sleep(0.01)
+
+def test_redis_framing_of_binary_chunked_values():
+    # CRLF and bulk-length lookalikes inside the value must survive framing
+    value = (b"\x00\r\n$5\r\n", b"*2\r\n" + bytes(range(256)) * 64)
+    
+    async def run():
+        fake, server, opened, store = await redis_store()
+        await store.set("k", value, 60)
+        result = await store.get("k")
+        missing = await store.get("missing")
+        deleted = await store.command("DEL", "k", "missing")
+        await shutdown(store, server)
+        return result, missing, deleted
+    
+    result, missing, deleted = asyncio.run(run())
+    
+    assert result == b"".join(value)
+    assert missing is None
+    assert deleted == 1
+
+def test_redis_error_reply_raises_and_keeps_the_connection():
+    async def run():
+        fake, server, opened, store = await redis_store()
+        with pytest.raises(RedisError, match="unknown command"):
+            await store.command("NOPE")
+        pong = await store.command("PING")
+        await shutdown(store, server)
+        return pong, len(opened)
+    
+    pong, connections = asyncio.run(run())
+    
+    assert pong == b"PONG"
+    assert connections == 1
+
+def test_redis_connections_are_capped():
+    async def run():
+        fake, server, opened, store = await redis_store(max_connections=3)
+        await store.set("k", (b"v",), 60)
+        results = await asyncio.gather(*(store.get("k") for _ in range(100)))
+        idle = len(store._idle)
+        await shutdown(store, server)
+        return results, len(opened), idle
+    
+    results, connections, idle = asyncio.run(run())
+    
+    assert results == [b"v"] * 100
+    assert connections <= 3
+    assert idle <= 3
+
+def test_redis_clear_escapes_glob_characters_in_the_prefix():
+    async def run():
+        fake, server, opened, store = await redis_store()
+        for key in ("a*b:v1:x:1", "a*b:v1:x:2", "aZZb:v1:x:3", "a*b:v1:y:4"):
+            await store.set(key, (b"v",), 60)
+        await store.clear("a*b:v1:x:")
+        left = sorted(key.decode() for key in fake.data)
+        await shutdown(store, server)
+        return left
+    
+    assert asyncio.run(run()) == ["a*b:v1:y:4", "aZZb:v1:x:3"]
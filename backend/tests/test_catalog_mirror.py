@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from services.catalog_mirror import CatalogMirror
+
+def product(product_id, title):
+    return {"id": product_id, "title": title, "categories": [], "brands": [], "availability": "IN_STOCK"}
+
+def test_snapshot_is_served_then_synced_at_once(tmp_path):
+    snapshot = tmp_path / "catalog.jsonl"
+    # A duplicated ID in the snapshot keeps its first position and last value
+    lines = [product("a", "old a"), product("b", "old b"), product("a", "newer a")]
+    snapshot.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    
+    synced = asyncio.Event()
+    
+    async def source():
+        await synced.wait()
+        for item in (product("a", "synced a"), product("c", "synced c")):
+            yield item
+    
+    mirror = CatalogMirror(snapshot_path=str(snapshot), sync_interval_seconds=900)
+    
+    async def run():
+        await mirror.start(source)
+        served = mirror.list_products(page_size=10)
+        synced.set()
+        for _ in range(100):
+            if mirror.syncs:
+                break
+            await asyncio.sleep(0.01)
+        await mirror.stop()
+        return served
+    
+    served = asyncio.run(run())
+    
+    assert [item["title"] for item in served["products"]] == ["newer a", "old b"]
+    assert mirror.syncs == 1
+    assert [item["title"] for item in mirror.list_products(page_size=10)["products"]] == ["synced a", "synced c"]
+
+def test_failed_startup_sync_is_retried_before_the_interval(monkeypatch):
+    attempts = []
+    
+    async def source():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        yield product("a", "a")
+    
+    mirror = CatalogMirror(snapshot_path=None, sync_interval_seconds=900)
+    monkeypatch.setattr(CatalogMirror, "RETRY_SECONDS", 0.01)
+    
+    async def run():
+        await mirror.start(source)
+        assert not mirror.ready
+        for _ in range(100):
+            if mirror.ready:
+                break
+            await asyncio.sleep(0.01)
+        await mirror.stop()
+    
+    asyncio.run(run())
+    
+    assert mirror.ready
+    assert len(attempts) == 2
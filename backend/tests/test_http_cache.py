@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import settings
+from http_cache import HTTPCacheMiddleware, etag_matches, make_etag, negotiate_encoding
+
+ETAG = '"0123456789abcdef0123456789abcdef"'
+
+def test_etag_matches_lists_weak_tags_and_star():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches('"other", ' + ETAG, ETAG)
+    assert etag_matches("W/" + ETAG, ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"other"', ETAG)
+    assert not etag_matches("", ETAG)
+
+def test_etag_matches_compressed_variants():
+    assert etag_matches(ETAG[:-1] + '-br"', ETAG)
+    assert etag_matches('"other", W/' + ETAG[:-1] + '-gzip"', ETAG)
+    assert not etag_matches('"other-br"', ETAG)
+
+def test_negotiate_encoding_prefers_br_and_honours_q_zero():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0") is None
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("*, br;q=0") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+def make_app(body):
+    async def document(request):
+        return JSONResponse(body)
+    
+    app = Starlette(routes=[Route("/doc", document), Route("/other", document)])
+    return HTTPCacheMiddleware(app)
+
+def test_compressed_variant_etag_and_304(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_CACHE_RULES", {"/doc": "public, max-age=60"})
+    monkeypatch.setattr(settings, "HTTP_COMPRESSION_MIN_BYTES", 100)
+    app = make_app({"items": ["drill"] * 200})
+    
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            plain = await client.get("/doc", headers={"Accept-Encoding": "identity"})
+            gzipped = await client.get("/doc", headers={"Accept-Encoding": "gzip"})
+            revalidated = await client.get("/doc", headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": gzipped.headers["etag"]
+            })
+            uncached = await client.get("/other", headers={"Accept-Encoding": "gzip"})
+            return plain, gzipped, revalidated, uncached
+    
+    plain, gzipped, revalidated, uncached = asyncio.run(run())
+    
+    assert plain.headers["etag"] == make_etag(plain.content)
+    assert plain.headers["cache-control"] == "public, max-age=60"
+    assert "content-encoding" not in plain.headers
+    
+    # Same body, different representation: the tag carries the encoding
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert gzipped.content == plain.content
+    
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == gzipped.headers["etag"]
+    
+    # Compressed, but not a cacheable route
+    assert uncached.headers["content-encoding"] == "gzip"
+    assert "etag" not in uncached.headers
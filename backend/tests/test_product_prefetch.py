@@ -0,0 +1,84 @@
+import asyncio
+
+from config import settings
+from services import product_prefetch
+from services.product_prefetch import ProductPrefetcher
+
+class FakeProducts:
+    """Fake products_service recording fetched IDs; IDs in missing raise"""
+    
+    def __init__(self, missing=()):
+        self.fetched = []
+        self.missing = missing
+    
+    async def get_product_message(self, product_id):
+        await asyncio.sleep(0)
+        if product_id in self.missing:
+            raise LookupError(product_id)
+        self.fetched.append(product_id)
+
+class FakeCache:
+    def __init__(self, cached=()):
+        self.cached = set(cached)
+    
+    def contains(self, product_id):
+        return product_id in self.cached
+
+def setup(monkeypatch, cached=(), missing=()):
+    products = FakeProducts(missing)
+    monkeypatch.setattr(settings, "PRODUCT_PREFETCH_ENABLED", True)
+    monkeypatch.setattr(settings, "CATALOG_MIRROR_ENABLED", False)
+    monkeypatch.setattr(settings, "PRODUCT_PREFETCH_TOP_K", 3)
+    monkeypatch.setattr(product_prefetch, "products_service", products)
+    monkeypatch.setattr(product_prefetch, "product_cache", FakeCache(cached))
+    return products
+
+def results(*product_ids):
+    return [{"id": product_id} for product_id in product_ids]
+
+async def prefetch_and_drain(prefetcher, page):
+    await prefetcher.prefetch(page)
+    while prefetcher.stats()["pending"]:
+        await asyncio.sleep(0.01)
+
+def test_top_results_not_cached_are_fetched(monkeypatch):
+    products = setup(monkeypatch, cached={"sku-2"}, missing={"sku-3"})
+    prefetcher = ProductPrefetcher()
+    
+    asyncio.run(prefetch_and_drain(prefetcher, results("sku-1", "sku-2", "sku-3", "sku-4")))
+    
+    # Only the top 3: sku-2 is already cached and sku-3 fails
+    assert products.fetched == ["sku-1"]
+    stats = prefetcher.stats()
+    assert (stats["scheduled"], stats["fetched"], stats["skipped_cached"], stats["errors"]) == (2, 1, 1, 1)
+
+def test_busy_server_drops_prefetches(monkeypatch):
+    products = setup(monkeypatch)
+    monkeypatch.setattr(settings, "PRODUCT_PREFETCH_MAX_HTTP_IN_FLIGHT", -1)
+    prefetcher = ProductPrefetcher()
+    
+    asyncio.run(prefetch_and_drain(prefetcher, results("sku-1", "sku-2")))
+    
+    assert products.fetched == []
+    assert prefetcher.stats()["dropped_busy"] == 2
+    assert prefetcher.stats()["scheduled"] == 0
+
+def test_pending_limit_drops_extra_prefetches(monkeypatch):
+    products = setup(monkeypatch)
+    monkeypatch.setattr(settings, "PRODUCT_PREFETCH_MAX_PENDING", 1)
+    prefetcher = ProductPrefetcher()
+    
+    asyncio.run(prefetch_and_drain(prefetcher, results("sku-1", "sku-2", "sku-3")))
+    
+    assert products.fetched == ["sku-1"]
+    assert prefetcher.stats()["dropped_full"] == 2
+
+def test_disabled_prefetcher_does_nothing(monkeypatch):
+    products = setup(monkeypatch)
+    monkeypatch.setattr(settings, "PRODUCT_PREFETCH_ENABLED", False)
+    prefetcher = ProductPrefetcher()
+    
+    asyncio.run(prefetch_and_drain(prefetcher, results("sku-1")))
+    
+    assert products.fetched == []
+    assert prefetcher.stats()["scheduled"] == 0
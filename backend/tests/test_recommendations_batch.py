@@ -0,0 +1,56 @@
+import asyncio
+
+from services.recommendations_service import recommendations_service
+
+def fake_recommendations(delays, errors=()):
+    """Fake get_recommendations that sleeps delays[model] and reports an error for models in errors"""
+    
+    async def get_recommendations(model, **kwargs):
+        await asyncio.sleep(delays.get(model, 0))
+        error = "upstream failed" if model in errors else None
+        return {"results": [{"id": f"{model}-1"}], "error": error}
+    
+    return get_recommendations
+
+def test_results_come_back_in_request_order(monkeypatch):
+    monkeypatch.setattr(recommendations_service, "get_recommendations", fake_recommendations({"a": 0.02, "b": 0}))
+    
+    results = asyncio.run(recommendations_service.get_recommendations_batch(
+        requests=[{"model": "a"}, {"model": "b"}],
+        timeout_seconds=1.0
+    ))
+    
+    assert [result["model"] for result in results] == ["a", "b"]
+    assert all(result["success"] for result in results)
+    assert results[0]["data"]["results"] == [{"id": "a-1"}]
+
+def test_slow_request_times_out_without_failing_the_batch(monkeypatch):
+    monkeypatch.setattr(recommendations_service, "get_recommendations", fake_recommendations({"slow": 5.0}))
+    
+    async def run():
+        started = asyncio.get_running_loop().time()
+        results = await recommendations_service.get_recommendations_batch(
+            requests=[{"model": "fast"}, {"model": "slow"}],
+            timeout_seconds=0.05
+        )
+        return results, asyncio.get_running_loop().time() - started
+    
+    (fast, slow), elapsed = asyncio.run(run())
+    
+    assert elapsed < 1.0
+    assert fast["success"] and fast["data"]["results"] == [{"id": "fast-1"}]
+    assert not slow["success"]
+    assert slow["data"] is None
+    assert slow["error"] == "Timed out after 0.05s"
+
+def test_request_error_is_reported_in_its_slot(monkeypatch):
+    monkeypatch.setattr(recommendations_service, "get_recommendations", fake_recommendations({}, errors={"bad"}))
+    
+    good, bad = asyncio.run(recommendations_service.get_recommendations_batch(
+        requests=[{"model": "good"}, {"model": "bad"}],
+        timeout_seconds=1.0
+    ))
+    
+    assert good["success"] and good["error"] is None
+    assert not bad["success"]
+    assert bad["error"] == "upstream failed"
@@ -0,0 +1,78 @@
+from google.cloud.retail_v2.types import PredictResponse
+import asyncio
+
+from config import settings
+from services.recommendations_cache import recommendations_cache
+from services.recommendations_service import recommendations_service
+from services.retail_clients import retail_clients
+
+class PredictionClient:
+    """Fake prediction client returning `available` results, at most page_size of them"""
+    
+    def __init__(self, available=20):
+        self.available = available
+        self.page_sizes = []
+    
+    async def predict(self, request, timeout=None):
+        self.page_sizes.append(request.page_size)
+        count = min(request.page_size, self.available)
+        return PredictResponse(results=[{"id": f"rec-{i}"} for i in range(count)], attribution_token="token")
+
+def setup(monkeypatch, client):
+    monkeypatch.setattr(retail_clients, "prediction", lambda: client)
+    monkeypatch.setattr(settings, "RECOMMENDATIONS_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RECOMMENDATIONS_WARM_PRODUCT_IDS", ["sku-1"])
+    monkeypatch.setattr(settings, "RECOMMENDATIONS_WARM_PAGE_SIZE", 10)
+    recommendations_cache.clear()
+
+def ids(response):
+    return [result["id"] for result in response["results"]]
+
+def test_warmed_entry_serves_smaller_page_sizes(monkeypatch):
+    client = PredictionClient()
+    setup(monkeypatch, client)
+    
+    async def run():
+        await recommendations_service.warm_cache()
+        warm_calls = len(client.page_sizes)
+        response = await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=6)
+        return warm_calls, response
+    
+    warm_calls, response = asyncio.run(run())
+    recommendations_cache.clear()
+    
+    # No further upstream call: the page of 6 is sliced from the warmed page of 10
+    assert len(client.page_sizes) == warm_calls
+    assert ids(response) == [f"rec-{i}" for i in range(6)]
+
+def test_larger_page_size_refetches(monkeypatch):
+    client = PredictionClient()
+    setup(monkeypatch, client)
+    
+    async def run():
+        await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=6)
+        larger = await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=12)
+        smaller = await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=4)
+        return larger, smaller
+    
+    larger, smaller = asyncio.run(run())
+    recommendations_cache.clear()
+    
+    assert client.page_sizes == [6, 12]
+    assert len(larger["results"]) == 12
+    assert len(smaller["results"]) == 4
+
+def test_short_entry_serves_any_page_size(monkeypatch):
+    # The model only has 3 results, so a cached page of 6 is complete for any size
+    client = PredictionClient(available=3)
+    setup(monkeypatch, client)
+    
+    async def run():
+        await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=6)
+        return await recommendations_service.get_recommendations("similar_items", product_id="sku-1", page_size=20)
+    
+    response = asyncio.run(run())
+    recommendations_cache.clear()
+    
+    assert client.page_sizes == [6]
+    assert len(response["results"]) == 3
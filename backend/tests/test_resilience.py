@@ -0,0 +1,149 @@
+from google.api_core import exceptions
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services.resilience import (
+    RetailUpstream,
+    CircuitOpenError,
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    hedge_wins
+)
+
+class FakeClient:
+    """
+    Stands in for a Retail API async client.
+    
+    Each call takes the next latency from the schedule (the last one repeats)
+    and then returns a numbered reply or raises `error`. Like gRPC, a call
+    slower than its timeout raises DeadlineExceeded once the timeout passes.
+    """
+    
+    def __init__(self, latencies, error=None):
+        self.latencies = list(latencies)
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.timeouts = []
+    
+    async def call(self, timeout):
+        self.calls += 1
+        number = self.calls
+        latency = self.latencies.pop(0) if len(self.latencies) > 1 else self.latencies[0]
+        self.timeouts.append(timeout)
+        try:
+            await asyncio.sleep(min(latency, timeout))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if latency > timeout:
+            raise exceptions.DeadlineExceeded(f"call {number} exceeded {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return f"reply-{number}"
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(settings, "RETAIL_RPC_TIMEOUTS", {"get_product": 2.0, "search": 0.05})
+    monkeypatch.setattr(settings, "RETAIL_HEDGING_ENABLED", True)
+    monkeypatch.setattr(settings, "RETAIL_HEDGE_PERCENTILE", 95.0)
+    monkeypatch.setattr(settings, "RETAIL_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(settings, "RETAIL_HEDGE_MIN_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "RETAIL_CIRCUIT_BREAKER_ENABLED", True)
+    monkeypatch.setattr(settings, "RETAIL_CIRCUIT_WINDOW", 4)
+    monkeypatch.setattr(settings, "RETAIL_CIRCUIT_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "RETAIL_CIRCUIT_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "RETAIL_CIRCUIT_OPEN_SECONDS", 0.05)
+    return RetailUpstream()
+
+def test_hedge_fires_after_percentile_and_faster_reply_wins(upstream):
+    # Five fast calls set the p95 delay, then the first attempt stalls and the hedge answers
+    client = FakeClient([0.01] * 5 + [1.0, 0.01])
+    wins_before = hedge_wins.total()
+    
+    async def run():
+        for _ in range(5):
+            await upstream.call("get_product", "0", client.call, hedge=True)
+        started = time.perf_counter()
+        reply = await upstream.call("get_product", "0", client.call, hedge=True)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0)  # Let the cancelled attempt unwind
+        return reply, elapsed
+    
+    reply, elapsed = asyncio.run(run())
+    
+    assert reply == "reply-7"
+    assert client.calls == 7
+    assert elapsed < 0.5
+    assert client.cancelled == 1
+    assert hedge_wins.total() == wins_before + 1
+
+def test_no_hedge_before_enough_samples(upstream):
+    client = FakeClient([0.05])
+    
+    reply = asyncio.run(upstream.call("get_product", "0", client.call, hedge=True))
+    
+    assert reply == "reply-1"
+    assert client.calls == 1
+
+def test_per_rpc_deadline_raises_on_time(upstream):
+    client = FakeClient([1.0])
+    
+    async def run():
+        started = time.perf_counter()
+        with pytest.raises(exceptions.DeadlineExceeded):
+            await upstream.call("search", "default_search", client.call)
+        return time.perf_counter() - started
+    
+    elapsed = asyncio.run(run())
+    
+    assert client.timeouts == [0.05]
+    assert elapsed < 0.5
+
+def test_circuit_opens_half_opens_and_closes(upstream):
+    failing = FakeClient([0.0], error=exceptions.ServiceUnavailable("down"))
+    healthy = FakeClient([0.02])
+    
+    async def run():
+        for _ in range(4):
+            with pytest.raises(exceptions.ServiceUnavailable):
+                await upstream.call("predict", "model", failing.call)
+        assert upstream.status()["predict"]["circuit"]["state"] == CIRCUIT_OPEN
+        
+        # Open: fail fast without calling upstream
+        with pytest.raises(CircuitOpenError):
+            await upstream.call("predict", "model", healthy.call)
+        assert healthy.calls == 0
+        
+        # After the cool-off one trial goes through; others are still rejected meanwhile
+        await asyncio.sleep(0.06)
+        trial = asyncio.ensure_future(upstream.call("predict", "model", healthy.call))
+        await asyncio.sleep(0)
+        assert upstream.status()["predict"]["circuit"]["state"] == CIRCUIT_HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await upstream.call("predict", "model", healthy.call)
+        
+        assert await trial == "reply-1"
+        assert upstream.status()["predict"]["circuit"]["state"] == CIRCUIT_CLOSED
+        assert await upstream.call("predict", "model", healthy.call) == "reply-2"
+    
+    asyncio.run(run())
+
+def test_not_found_is_not_an_upstream_failure(upstream):
+    client = FakeClient([0.0], error=exceptions.NotFound("no such product"))
+    
+    async def run():
+        for _ in range(10):
+            with pytest.raises(exceptions.NotFound):
+                await upstream.call("get_product", "0", client.call)
+    
+    asyncio.run(run())
+    
+    circuit = upstream.status()["get_product"]["circuit"]
+    assert circuit["state"] == CIRCUIT_CLOSED
+    assert circuit["window_failures"] == 0
+    assert client.calls == 10
@@ -0,0 +1,34 @@
+import asyncio
+
+from services.search_cache import SearchCache
+
+def page(timed_out=0, failed=0):
+    return {
+        "results": [{"id": "sku-1", "product": {"title": ""}}],
+        "hydration": {"requested": 1, "hydrated": 1 - timed_out - failed, "failed": failed, "timed_out": timed_out}
+    }
+
+def test_partially_hydrated_pages_are_not_cached():
+    cache = SearchCache(max_entries=10, ttl_seconds=30, stale_seconds=60, visitor_policy="ignore")
+    responses = [page(timed_out=1), page(failed=1), page()]
+    fetched = []
+    
+    async def fetch():
+        fetched.append(responses[len(fetched)])
+        return fetched[-1]
+    
+    async def run():
+        first = await cache.get_or_fetch("key", "default_search", fetch)
+        second = await cache.get_or_fetch("key", "default_search", fetch)
+        third = await cache.get_or_fetch("key", "default_search", fetch)
+        fourth = await cache.get_or_fetch("key", "default_search", fetch)
+        return first, second, third, fourth
+    
+    first, second, third, fourth = asyncio.run(run())
+    
+    # The two partial pages are served but refetched; the complete one is then cached
+    assert len(fetched) == 3
+    assert first["hydration"]["timed_out"] == 1
+    assert second["hydration"]["failed"] == 1
+    assert fourth is third
+    assert cache.stats()["skipped_partial"] == 2
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import httpx
+
+from main import app
+from services.retail_clients import retail_clients
+
+UPSTREAM_SECONDS = 0.2
+REQUESTS = 10
+
+class SlowSearchClient:
+    """Stands in for SearchServiceAsyncClient; every search takes UPSTREAM_SECONDS"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def search(self, request, timeout=None):
+        self.calls += 1
+        await asyncio.sleep(UPSTREAM_SECONDS)
+        return type("SearchResponse", (), {
+            "results": [],
+            "facets": [],
+            "total_size": 0,
+            "attribution_token": "",
+            "next_page_token": "",
+            "corrected_query": ""
+        })()
+
+def test_concurrent_searches_overlap(monkeypatch):
+    client = SlowSearchClient()
+    monkeypatch.setattr(retail_clients, "search", lambda: client)
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            started = time.perf_counter()
+            # Distinct queries, so identical-request coalescing cannot hide serial calls
+            responses = await asyncio.gather(*(
+                http.post("/api/search", json={"query": f"drill {i}", "visitor_id": "v1"})
+                for i in range(REQUESTS)
+            ))
+            return time.perf_counter() - started, responses
+    
+    elapsed, responses = asyncio.run(run())
+    
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    assert client.calls == REQUESTS
+    # Serial handling would take REQUESTS * UPSTREAM_SECONDS (2s)
+    assert elapsed < UPSTREAM_SECONDS * 3
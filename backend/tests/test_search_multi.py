@@ -0,0 +1,69 @@
+import asyncio
+
+from services.retail_search_service import retail_search_service
+
+class FakeSearch:
+    """Fake search() keyed by query: sleeps delays[query], raises for queries in errors, tracks peak concurrency"""
+    
+    def __init__(self, delays=None, errors=()):
+        self.delays = delays or {}
+        self.errors = errors
+        self.running = 0
+        self.peak = 0
+    
+    async def __call__(self, query, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(query, 0.01))
+            if query in self.errors:
+                raise RuntimeError(f"{query} failed")
+            return {"results": [{"id": f"{query}-1"}], "total_size": 1}
+        finally:
+            self.running -= 1
+
+def test_results_come_back_in_request_order(monkeypatch):
+    search = FakeSearch(delays={"shoes": 0.03, "hats": 0})
+    monkeypatch.setattr(retail_search_service, "search", search)
+    
+    results = asyncio.run(retail_search_service.search_multi(
+        searches=[{"query": "shoes"}, {"query": "hats"}],
+        concurrency=5,
+        timeout_seconds=1.0
+    ))
+    
+    assert [result["data"]["results"][0]["id"] for result in results] == ["shoes-1", "hats-1"]
+    assert all(result["success"] and result["error"] is None for result in results)
+
+def test_concurrency_is_bounded(monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(retail_search_service, "search", search)
+    
+    results = asyncio.run(retail_search_service.search_multi(
+        searches=[{"query": f"q{i}"} for i in range(6)],
+        concurrency=2,
+        timeout_seconds=1.0
+    ))
+    
+    assert all(result["success"] for result in results)
+    assert search.peak == 2
+
+def test_failed_and_timed_out_searches_keep_their_slots(monkeypatch):
+    search = FakeSearch(delays={"slow": 5.0}, errors={"bad"})
+    monkeypatch.setattr(retail_search_service, "search", search)
+    
+    async def run():
+        started = asyncio.get_running_loop().time()
+        results = await retail_search_service.search_multi(
+            searches=[{"query": "bad"}, {"query": "slow"}, {"query": "good"}],
+            concurrency=5,
+            timeout_seconds=0.1
+        )
+        return results, asyncio.get_running_loop().time() - started
+    
+    (bad, slow, good), elapsed = asyncio.run(run())
+    
+    assert elapsed < 1.0
+    assert bad == {"success": False, "data": None, "error": "bad failed"}
+    assert slow == {"success": False, "data": None, "error": "Timed out after 0.1s"}
+    assert good["success"] and good["data"]["results"] == [{"id": "good-1"}]
@@ -0,0 +1,140 @@
+import asyncio
+
+from config import settings
+from services.retail_clients import retail_clients
+from services.retail_search_service import retail_search_service
+from services.search_window import SearchWindowCache, search_window
+
+TOTAL = 100
+
+class WindowFetch:
+    """Fake window fetch over a catalog of TOTAL results, recording each (size, start)"""
+    
+    def __init__(self, timed_out=0):
+        self.calls = []
+        self.timed_out = timed_out
+    
+    async def __call__(self, size, start):
+        self.calls.append((size, start))
+        await asyncio.sleep(0)
+        return {
+            "results": [{"id": f"sku-{i}"} for i in range(start, min(start + size, TOTAL))],
+            "total_size": TOTAL,
+            "next_page_token": "upstream-token",
+            "hydration": {"requested": 0, "hydrated": 0, "failed": 0, "timed_out": self.timed_out}
+        }
+
+def make_windows(**overrides):
+    options = {"max_entries": 100, "ttl_seconds": 60, "pages": 5, "max_results": 120, "prefetch_pages": 0}
+    options.update(overrides)
+    return SearchWindowCache(**options)
+
+def ids(page):
+    return [result["id"] for result in page["results"]]
+
+def test_pages_are_sliced_from_one_window():
+    windows = make_windows()
+    fetch = WindowFetch()
+    
+    async def run():
+        return [await windows.get_page("session", 10, offset, fetch) for offset in (0, 10, 40)]
+    
+    first, second, last = asyncio.run(run())
+    
+    assert fetch.calls == [(50, 0)]
+    assert ids(first) == [f"sku-{i}" for i in range(0, 10)]
+    assert ids(second) == [f"sku-{i}" for i in range(10, 20)]
+    assert ids(last) == [f"sku-{i}" for i in range(40, 50)]
+    # The upstream token points past the window, so pages do not pass it on
+    assert first["next_page_token"] == ""
+    assert first["total_size"] == TOTAL
+
+def test_offset_past_the_window_fetches_the_next_window():
+    windows = make_windows()
+    fetch = WindowFetch()
+    
+    async def run():
+        await windows.get_page("session", 10, 0, fetch)
+        return await windows.get_page("session", 10, 60, fetch)
+    
+    page = asyncio.run(run())
+    
+    assert fetch.calls == [(50, 0), (50, 50)]
+    assert ids(page) == [f"sku-{i}" for i in range(60, 70)]
+
+def test_next_window_is_prefetched_near_the_end():
+    windows = make_windows(prefetch_pages=2)
+    fetch = WindowFetch()
+    
+    async def run():
+        await windows.get_page("session", 10, 0, fetch)
+        assert fetch.calls == [(50, 0)]
+        # Page 4 of 5 leaves one page in the window: the next one is fetched in the background
+        await windows.get_page("session", 10, 30, fetch)
+        await asyncio.sleep(0.01)
+        assert fetch.calls == [(50, 0), (50, 50)]
+        return await windows.get_page("session", 10, 50, fetch)
+    
+    page = asyncio.run(run())
+    
+    assert ids(page) == [f"sku-{i}" for i in range(50, 60)]
+    assert len(fetch.calls) == 2
+    assert windows.stats()["prefetches"] == 1
+
+def test_no_prefetch_past_the_last_result():
+    windows = make_windows(prefetch_pages=2)
+    fetch = WindowFetch()
+    
+    async def run():
+        await windows.get_page("session", 10, 90, fetch)
+        await asyncio.sleep(0.01)
+    
+    asyncio.run(run())
+    
+    assert fetch.calls == [(50, 50)]
+    assert windows.stats()["prefetches"] == 0
+
+def test_partially_hydrated_windows_are_not_kept():
+    windows = make_windows()
+    fetch = WindowFetch(timed_out=3)
+    
+    async def run():
+        await windows.get_page("session", 10, 0, fetch)
+        await windows.get_page("session", 10, 10, fetch)
+    
+    asyncio.run(run())
+    
+    assert fetch.calls == [(50, 0), (50, 0)]
+    assert windows.stats()["skipped_partial"] == 2
+
+def test_unwindowable_requests_fall_through_to_a_plain_search(monkeypatch):
+    requests = []
+    
+    class SearchClient:
+        async def search(self, request, timeout=None):
+            requests.append((request.page_size, request.offset))
+            return type("SearchResponse", (), {
+                "results": [],
+                "facets": [],
+                "total_size": 0,
+                "attribution_token": "",
+                "next_page_token": "",
+                "corrected_query": ""
+            })()
+    
+    client = SearchClient()
+    monkeypatch.setattr(retail_clients, "search", lambda: client)
+    monkeypatch.setattr(settings, "SEARCH_WINDOW_ENABLED", True)
+    search_window.clear()
+    
+    async def run():
+        # Unaligned offset, and a page size too large for a multi-page window
+        await retail_search_service.search(query="saw", page_size=10, offset=5)
+        await retail_search_service.search(query="saw", page_size=100, offset=0)
+        # Aligned: served through a window
+        await retail_search_service.search(query="saw", page_size=10, offset=0)
+    
+    asyncio.run(run())
+    search_window.clear()
+    
+    assert requests == [(10, 5), (100, 0), (10 * search_window.pages, 0)]
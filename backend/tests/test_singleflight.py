@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+    
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+    
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 4
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+    finished = []
+    
+    async def fetch():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        return "value"
+    
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(run()) == "value"
+    assert finished == [1]
+
+def test_every_waiter_sees_the_error():
+    flight = SingleFlight("test")
+    
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+    
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream failed" for result in results)
+
+def test_key_is_cleared_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        if len(calls) == 1:
+            raise RuntimeError("first call fails")
+        return len(calls)
+    
+    async def run():
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fetch)
+        assert not flight.in_flight("key")
+        # Nothing is remembered: the next call for the key runs again
+        result = await flight.do("key", fetch)
+        assert not flight.in_flight("key")
+        return result
+    
+    assert asyncio.run(run()) == 2
+    assert flight.stats()["in_flight"] == 0